@@ -0,0 +1,23 @@
+import importlib
+
+# Names exported by the package, the modules are imported on first access
+_EXPORTS = {
+    'Client': 'climacell.api',
+    'Error': 'climacell.api',
+    'Measurement': 'climacell.api',
+    'Response': 'climacell.api',
+    'StaleWhileRevalidate': 'climacell.serving',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
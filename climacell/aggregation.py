@@ -0,0 +1,308 @@
+import math
+from collections import deque
+
+from climacell.fields import (
+    FIELD_PRECIPITATION_ACCUMULATION, FIELD_WIND_DIRECTION, FIELD_WIND_GUST,
+)
+
+AGGREGATE_MIN = 'min'
+AGGREGATE_MAX = 'max'
+AGGREGATE_MEAN = 'mean'
+AGGREGATE_SUM = 'sum'
+AGGREGATE_CIRCULAR_MEAN = 'circular_mean'
+
+# Aggregation of fields that cannot be averaged, other fields use the mean
+RULES = {
+    FIELD_PRECIPITATION_ACCUMULATION: AGGREGATE_SUM,
+    FIELD_WIND_DIRECTION: AGGREGATE_CIRCULAR_MEAN,
+    FIELD_WIND_GUST: AGGREGATE_MAX,
+}
+
+
+def circular_mean(degrees):
+    """
+    :param list[float] degrees: angles in degrees
+    :return: the mean angle in degrees between 0 and 360
+    :rtype: float
+    """
+    sin = sum(math.sin(math.radians(value)) for value in degrees)
+    cos = sum(math.cos(math.radians(value)) for value in degrees)
+    return _angle(sin, cos)
+
+
+def _angle(sin, cos):
+    """
+    :return: the angle of the summed vectors in degrees in [0, 360)
+    :rtype: float
+    """
+    angle = math.degrees(math.atan2(sin, cos)) % 360
+    # a tiny negative angle wraps around to exactly 360.0
+    return 0.0 if angle >= 360 else angle
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+REDUCERS = {
+    AGGREGATE_MIN: min,
+    AGGREGATE_MAX: max,
+    AGGREGATE_MEAN: mean,
+    AGGREGATE_SUM: sum,
+    AGGREGATE_CIRCULAR_MEAN: circular_mean,
+}
+
+
+def rule_for(name, field=None):
+    """
+    Returns the aggregation for a series. Daily aggregates keep their
+    aggregation, e.g. temp_min is aggregated with min.
+
+    :param str name: series name, e.g. temp or temp_min
+    :param str field: the data field of the series, defaults to the name
+    :return: one of the AGGREGATE_ constants
+    :rtype: str
+    """
+    field = name if field is None else field
+
+    if field in RULES:
+        return RULES[field]
+
+    aggregate = name[len(field) + 1:]
+    if aggregate in (AGGREGATE_MIN, AGGREGATE_MAX):
+        return aggregate
+
+    return AGGREGATE_MEAN
+
+
+def clean(timestamps, values):
+    """
+    Drop missing (None or NaN) values
+
+    :param timestamps: seconds since the epoch, sorted ascending
+    :param values: the values at the timestamps
+    :return: the remaining timestamps and values
+    :rtype: tuple[list[float], list[float]]
+    """
+    kept_timestamps = []
+    kept_values = []
+
+    for timestamp, value in zip(timestamps, values):
+        if value is not None and value == value:
+            kept_timestamps.append(timestamp)
+            kept_values.append(value)
+
+    return kept_timestamps, kept_values
+
+
+def tumbling(timestamps, values, width, how=AGGREGATE_MEAN, origin=0):
+    """
+    Aggregate values in consecutive, non-overlapping windows in a single pass
+
+    :param timestamps: seconds since the epoch, sorted ascending
+    :param values: the values at the timestamps
+    :param float width: window width in seconds
+    :param str how: one of the AGGREGATE_ constants
+    :param float origin: windows start at origin + n * width
+    :return: the start of every non-empty window and its aggregate
+    :rtype: tuple[list[float], list[float]]
+    """
+    reduce = REDUCERS[how]
+    timestamps, values = clean(timestamps, values)
+    starts = []
+    aggregates = []
+    window = None
+    first = 0
+
+    for i, timestamp in enumerate(timestamps):
+        current = (timestamp - origin) // width
+        if current != window:
+            if window is not None:
+                starts.append(origin + window * width)
+                aggregates.append(reduce(values[first:i]))
+            window = current
+            first = i
+
+    if window is not None:
+        starts.append(origin + window * width)
+        aggregates.append(reduce(values[first:]))
+
+    return starts, aggregates
+
+
+class _RunningSum:
+    def __init__(self, how):
+        self.how = how
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, i, value):
+        self.total += value
+        self.count += 1
+
+    def remove(self, i, value):
+        self.total -= value
+        self.count -= 1
+
+    def result(self):
+        if self.how == AGGREGATE_SUM:
+            return self.total
+
+        return self.total / self.count
+
+
+class _RunningCircularMean:
+    def __init__(self, how):
+        self.sin = 0.0
+        self.cos = 0.0
+
+    def add(self, i, value):
+        self.sin += math.sin(math.radians(value))
+        self.cos += math.cos(math.radians(value))
+
+    def remove(self, i, value):
+        self.sin -= math.sin(math.radians(value))
+        self.cos -= math.cos(math.radians(value))
+
+    def result(self):
+        return _angle(self.sin, self.cos)
+
+
+class _RunningExtreme:
+    def __init__(self, how):
+        # Monotonic queue of (index, value), the front is the current extreme
+        self.better = (lambda a, b: a <= b) if how == AGGREGATE_MIN else (lambda a, b: a >= b)
+        self.queue = deque()
+
+    def add(self, i, value):
+        while self.queue and self.better(value, self.queue[-1][1]):
+            self.queue.pop()
+        self.queue.append((i, value))
+
+    def remove(self, i, value):
+        if self.queue[0][0] == i:
+            self.queue.popleft()
+
+    def result(self):
+        return self.queue[0][1]
+
+
+RUNNING = {
+    AGGREGATE_MIN: _RunningExtreme,
+    AGGREGATE_MAX: _RunningExtreme,
+    AGGREGATE_MEAN: _RunningSum,
+    AGGREGATE_SUM: _RunningSum,
+    AGGREGATE_CIRCULAR_MEAN: _RunningCircularMean,
+}
+
+
+def rolling(timestamps, values, window, how=AGGREGATE_MEAN):
+    """
+    Aggregate the values in the window (timestamp - window, timestamp] of
+    every point. Runs in linear time, values enter and leave the window once.
+
+    :param timestamps: seconds since the epoch, sorted ascending
+    :param values: the values at the timestamps
+    :param float window: window length in seconds
+    :param str how: one of the AGGREGATE_ constants
+    :return: the timestamps and the aggregate at every timestamp
+    :rtype: tuple[list[float], list[float]]
+    """
+    timestamps, values = clean(timestamps, values)
+    running = RUNNING[how](how)
+    aggregates = []
+    first = 0
+
+    for i, timestamp in enumerate(timestamps):
+        running.add(i, values[i])
+
+        while timestamps[first] <= timestamp - window:
+            running.remove(first, values[first])
+            first += 1
+
+        aggregates.append(running.result())
+
+    return timestamps, aggregates
+
+
+def lttb(timestamps, values, threshold):
+    """
+    Downsample with the Largest-Triangle-Three-Buckets algorithm, which keeps
+    the visual shape of a series
+
+    :param timestamps: seconds since the epoch, sorted ascending
+    :param values: the values at the timestamps
+    :param int threshold: number of points to keep
+    :return: the selected timestamps and values
+    :rtype: tuple[list[float], list[float]]
+    """
+    timestamps, values = clean(timestamps, values)
+    size = len(values)
+
+    if threshold <= 0 or threshold >= size:
+        return timestamps, values
+
+    if threshold < 3:
+        selected = [0, size - 1][:threshold]
+        return [timestamps[i] for i in selected], [values[i] for i in selected]
+
+    every = (size - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+
+    for bucket in range(threshold - 2):
+        # average point of the next bucket
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        avg_t = sum(timestamps[next_start:next_end]) / (next_end - next_start)
+        avg_v = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        # point of the current bucket forming the largest triangle with a and the average
+        t_a = timestamps[a]
+        v_a = values[a]
+        best = start = int(bucket * every) + 1
+        best_area = -1.0
+
+        for i in range(start, int((bucket + 1) * every) + 1):
+            area = abs((t_a - avg_t) * (values[i] - v_a) - (t_a - timestamps[i]) * (avg_v - v_a))
+            if area > best_area:
+                best_area = area
+                best = i
+
+        selected.append(best)
+        a = best
+
+    selected.append(size - 1)
+    return [timestamps[i] for i in selected], [values[i] for i in selected]
+
+
+def downsample(name, timestamps, values, max_points, field=None):
+    """
+    Reduce a series to at most max_points following the aggregation rule of
+    the series: averaged fields use LTTB, other fields are aggregated in
+    tumbling windows so that e.g. accumulations keep their total.
+
+    :param str name: series name, e.g. temp or temp_min
+    :param timestamps: seconds since the epoch, sorted ascending
+    :param values: the values at the timestamps
+    :param int max_points: maximum number of points, 0 to keep all points
+    :param str field: the data field of the series, defaults to the name
+    :return: the downsampled timestamps and values
+    :rtype: tuple[list[float], list[float]]
+    """
+    timestamps, values = clean(timestamps, values)
+
+    if max_points <= 0 or len(values) <= max_points:
+        return timestamps, values
+
+    how = rule_for(name, field)
+
+    if how == AGGREGATE_MEAN:
+        return lttb(timestamps, values, max_points)
+
+    if max_points == 1:
+        return [timestamps[0]], [REDUCERS[how](values)]
+
+    # max_points windows of this width, starting at the first timestamp, cover the series
+    width = (timestamps[-1] - timestamps[0]) / (max_points - 1)
+    return tumbling(timestamps, values, width, how, origin=timestamps[0])
@@ -0,0 +1,323 @@
+import bisect
+import operator
+
+from climacell.fields import FIELD_CLOUD_COVER, FIELD_DEW_POINT, FIELD_TEMP, FIELD_WIND_SPEED
+from climacell.utils import parse_timestamp
+from weather_utils import calculate_fog_probability, calculate_fog_temperature, calculate_okta, ms_to_knots
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+STATE_FIRING = 'firing'
+STATE_RESOLVED = 'resolved'
+
+# Marks a point that is no longer part of the forecast
+_REMOVED = object()
+
+
+class Rule:
+    def __init__(self, name, field, op, threshold, duration=0):
+        """
+        :param str name: unique name of the rule
+        :param str field: series name the rule applies to, e.g. wind_gust, temp_min or a derived field
+        :param str op: one of the OPERATORS
+        :param threshold: value to compare with, a string for categorical fields
+        :param float duration: seconds the condition has to hold for consecutive points
+        """
+        if op not in OPERATORS:
+            raise ValueError(f'Invalid operator {op}')
+
+        self.name = name
+        self.field = field
+        self.op = op
+        self.threshold = threshold
+        self.duration = duration
+        compare = OPERATORS[op]
+        self.test = lambda value: value is not None and compare(value, threshold)
+
+
+class DerivedField:
+    def __init__(self, name, inputs, function):
+        """
+        A field calculated per observation time from other fields
+
+        :param str name: name of the derived field
+        :param list[str] inputs: series names passed to the function
+        :param callable function: called with the input values, not called if one is missing
+        """
+        self.name = name
+        self.inputs = inputs
+        self.function = function
+
+    def calculate(self, values):
+        if any(value is None for value in values):
+            return None
+
+        return self.function(*values)
+
+
+def fog_probability(temperature, dew_point, cloud_cover, wind_speed):
+    """
+    Fog probability for a forecast point in si units, see weather_utils.calculate_fog_probability
+
+    :param float temperature: temperature in celsius
+    :param float dew_point: dew point in celsius
+    :param float cloud_cover: cloud cover percentage
+    :param float wind_speed: wind speed in m/s
+    :return: fog probability on a scale of 1 to 5
+    :rtype: int
+    """
+    okta = calculate_okta(cloud_cover)
+    fog_temperature = calculate_fog_temperature(temperature, dew_point, okta, ms_to_knots(wind_speed))
+    return calculate_fog_probability(temperature, fog_temperature)
+
+
+FOG_PROBABILITY = DerivedField(
+    'fog_probability', [FIELD_TEMP, FIELD_DEW_POINT, FIELD_CLOUD_COVER, FIELD_WIND_SPEED], fog_probability
+)
+
+
+class AlertTransition:
+    def __init__(self, location, rule, state, start):
+        """
+        :param str location: location the rule fired or resolved for
+        :param str rule: name of the rule
+        :param str state: STATE_FIRING or STATE_RESOLVED
+        :param float start: epoch seconds of the first point meeting the rule, None when resolved
+        """
+        self.location = location
+        self.rule = rule
+        self.state = state
+        self.start = start
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+    def __repr__(self):
+        return f'AlertTransition({self.location!r}, {self.rule!r}, {self.state!r}, {self.start!r})'
+
+
+class _RuleState:
+    def __init__(self, rule):
+        self.rule = rule
+        self.times = []
+        self.conditions = {}
+        # qualifying runs of consecutive matching points, start time to end time
+        self.runs = {}
+
+    @property
+    def firing(self):
+        return bool(self.runs)
+
+    def _apply(self, time, value):
+        """
+        :return: the index around which runs have to be recomputed
+        """
+        times = self.times
+
+        if value is _REMOVED:
+            if time in self.conditions:
+                del self.conditions[time]
+                index = bisect.bisect_left(times, time)
+                del times[index]
+                return index
+            return None
+
+        if time not in self.conditions:
+            bisect.insort(times, time)
+
+        self.conditions[time] = self.rule.test(value)
+        return bisect.bisect_left(times, time)
+
+    def _region(self, index, removed):
+        """
+        :return: first and last index of the points whose runs may have changed
+        """
+        times = self.times
+        conditions = self.conditions
+        first = max(index - 1 if removed else index, 0)
+        last = min(index, len(times) - 1)
+
+        while first > 0 and conditions[times[first - 1]]:
+            first -= 1
+        while last < len(times) - 1 and conditions[times[last + 1]]:
+            last += 1
+
+        return first, last
+
+    def _recompute(self, time, first, last):
+        times = self.times
+        start = min(times[first], time)
+        end = max(times[last], time)
+        self.runs = {s: e for s, e in self.runs.items() if e < start or s > end}
+        run_start = None
+
+        for i in range(first, last + 1):
+            current = times[i]
+            if self.conditions[current]:
+                run_start = current if run_start is None else run_start
+                if current - run_start >= self.rule.duration:
+                    self.runs[run_start] = current
+            else:
+                run_start = None
+
+    def update(self, changes):
+        """
+        Apply changed points and re-evaluate only the runs around them
+
+        :param dict changes: value or _REMOVED per epoch second
+        """
+        for time, value in changes.items():
+            index = self._apply(time, value)
+
+            if index is None:
+                continue
+
+            if not self.times:
+                self.runs = {}
+                continue
+
+            self._recompute(time, *self._region(index, value is _REMOVED))
+
+
+class AlertEngine:
+    def __init__(self, rules, derived=()):
+        """
+        Evaluates threshold and duration rules incrementally per location
+
+        :param list[Rule] rules: rules to evaluate
+        :param list[DerivedField] derived: derived fields the rules may refer to
+        """
+        self.rules = rules
+        self.derived = {field.name: field for field in derived}
+        self._rules_by_field = {}
+        self._derived_by_input = {}
+
+        for rule in rules:
+            self._rules_by_field.setdefault(rule.field, []).append(rule)
+
+        for field in derived:
+            for name in field.inputs:
+                self._derived_by_input.setdefault(name, []).append(field)
+
+        self.fields = set(self._rules_by_field) | set(self._derived_by_input)
+        self._values = {}
+        self._states = {}
+
+    def _location_state(self, location):
+        if location not in self._values:
+            self._values[location] = {field: {} for field in self.fields}
+            self._states[location] = {rule.name: _RuleState(rule) for rule in self.rules}
+
+        return self._values[location], self._states[location]
+
+    def update(self, location, columns):
+        """
+        Evaluate a full new forecast for a location. Points that did not change
+        since the previous forecast are not evaluated again.
+
+        :param str location: location of the forecast
+        :param climacell.parsing.Columns columns: the new forecast
+        :return: the alert transitions caused by the forecast
+        :rtype: list[AlertTransition]
+        """
+        values, _ = self._location_state(location)
+        changes = {}
+        parsed = {}
+
+        for name, series in columns.series.items():
+            if name not in self.fields:
+                continue
+
+            key = id(series.times)
+            if key not in parsed:
+                parsed[key] = [None if time is None else parse_timestamp(time) for time in series.times]
+
+            current = dict(zip(parsed[key], series.decoded()))
+            current.pop(None, None)
+            stored = values[name]
+            changed = {time: value for time, value in current.items() if stored.get(time, _REMOVED) != value}
+            changed.update({time: _REMOVED for time in stored if time not in current})
+
+            if changed:
+                changes[name] = changed
+
+        return self._evaluate(location, changes)
+
+    def apply_delta(self, location, delta):
+        """
+        Evaluate the difference between two forecasts for a location
+
+        :param str location: location of the forecast
+        :param climacell.delta.Delta delta: the difference with the previous forecast
+        :return: the alert transitions caused by the difference
+        :rtype: list[AlertTransition]
+        """
+        changes = {}
+
+        for name, time, value in delta.inserted:
+            changes.setdefault(name, {})[parse_timestamp(time)] = value
+        for name, time, _, value in delta.changed:
+            changes.setdefault(name, {})[parse_timestamp(time)] = value
+        for name, time, _ in delta.dropped:
+            changes.setdefault(name, {})[parse_timestamp(time)] = _REMOVED
+
+        changes = {name: changed for name, changed in changes.items() if name in self.fields}
+        return self._evaluate(location, changes)
+
+    def _derive(self, values, changes):
+        for field in {field for name in changes for field in self._derived_by_input.get(name, [])}:
+            times = {time for name in field.inputs for time in changes.get(name, {})}
+            derived = {}
+
+            for time in times:
+                inputs = [values[name].get(time, _REMOVED) for name in field.inputs]
+                if any(value is _REMOVED for value in inputs):
+                    derived[time] = _REMOVED
+                else:
+                    derived[time] = field.calculate(inputs)
+
+            changes[field.name] = derived
+
+    def _evaluate(self, location, changes):
+        values, states = self._location_state(location)
+
+        for name, changed in changes.items():
+            for time, value in changed.items():
+                if value is _REMOVED:
+                    values[name].pop(time, None)
+                else:
+                    values[name][time] = value
+
+        self._derive(values, changes)
+        transitions = []
+
+        for name, changed in changes.items():
+            for rule in self._rules_by_field.get(name, []):
+                state = states[rule.name]
+                was_firing = state.firing
+                state.update(changed)
+
+                if state.firing and not was_firing:
+                    transitions.append(AlertTransition(location, rule.name, STATE_FIRING, min(state.runs)))
+                elif was_firing and not state.firing:
+                    transitions.append(AlertTransition(location, rule.name, STATE_RESOLVED, None))
+
+        return transitions
+
+    def firing(self, location):
+        """
+        :param str location:
+        :return: names of the rules currently firing for the location
+        :rtype: list[str]
+        """
+        if location not in self._states:
+            return []
+
+        return [name for name, state in self._states[location].items() if state.firing]
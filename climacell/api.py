@@ -1,12 +1,72 @@
-import requests
-
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from climacell.fields import ENDPOINT_DAILY, ENDPOINT_HOURLY, ENDPOINT_NOWCAST, normalize_fields
+from climacell.instrumentation import NOOP, PHASE_REQUEST, PHASE_SERVER, PHASE_DECODE, PHASE_PARSE
+from climacell.parsing import Columns, get_plan
+from climacell.resilience import CircuitOpenError
 from climacell.utils import join_fields, check_datetime_str, parse_datetime_str
 
+BASE_URL = "https://api.climacell.co/v3"
+
+PATHS = {
+    ENDPOINT_NOWCAST: '/weather/nowcast',
+    ENDPOINT_HOURLY: '/weather/forecast/hourly',
+    ENDPOINT_DAILY: '/weather/forecast/daily',
+}
+
+# Seconds to wait for a response, without a timeout a hanging request blocks forever
+DEFAULT_TIMEOUT = 10.0
+
+
+def __getattr__(name):
+    # requests is imported on first use, it takes longer to import than the rest of the package
+    if name == 'requests':
+        import requests
+        return requests
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+class RequestsTransport:
+    def get(self, url, params, headers, timeout=None):
+        """
+        :param str url: url to request
+        :param dict params: query parameters
+        :param dict headers: request headers
+        :param float timeout: seconds to wait for the response, None to wait forever
+        :return: the response
+        :rtype: requests.Response
+        """
+        import requests
+
+        return requests.get(url, params=params, headers=headers, timeout=timeout)
+
 
 class Client:
-    def __init__(self, api_key):
-        self.base_url = "https://api.climacell.co/v3"
+    def __init__(self, api_key, instrumentation=NOOP, base_url=BASE_URL, transport=None, timeouts=None,
+                 timeout=DEFAULT_TIMEOUT, hedging=None, circuit_breaker=None):
+        """
+        :param str api_key: ClimaCell api key
+        :param climacell.instrumentation.Instrumentation instrumentation: receives request lifecycle events
+        :param str base_url: url of the API, e.g. of a stub server
+        :param transport: executes the requests, see climacell.transport, defaults to RequestsTransport
+        :param dict[str, float] timeouts: timeout in seconds per endpoint, e.g. {'hourly': 5}
+        :param float timeout: timeout in seconds of the other endpoints
+        :param climacell.resilience.Hedging hedging: sends duplicates of slow requests, disabled by default
+        :param climacell.resilience.CircuitBreaker circuit_breaker: fails fast while the API is failing
+        """
+        self.base_url = base_url
         self.api_key = api_key
+        self.instrumentation = instrumentation
+        self.transport = transport or RequestsTransport()
+        self.timeouts = {PATHS.get(endpoint, endpoint): seconds for endpoint, seconds in (timeouts or {}).items()}
+        self.timeout = timeout
+        self.hedging = hedging
+        self.circuit_breaker = circuit_breaker
+        self._executor = None
+        self._lock = threading.Lock()
 
     def _do_request(self, endpoint, params):
         """
@@ -15,12 +75,130 @@ class Client:
         :param dict params: parameters to add to request
         :return: request result
         """
+        return self._request(endpoint, params, self.api_key)
+
+    def _request(self, endpoint, params, api_key):
+        """
+        Execute the request with the provided parameters and API key
+        :param string endpoint: endpoint to call
+        :param dict params: parameters to add to request
+        :param str api_key: ClimaCell api key
+        :return: request result
+        """
 
         headers = {
-            'apikey': self.api_key
+            'apikey': api_key
         }
 
-        return requests.get(self.base_url + endpoint, params=params, headers=headers)
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f'Circuit open, not requesting {endpoint}')
+
+        token = self.instrumentation.phase_start(PHASE_REQUEST, endpoint)
+
+        try:
+            response = self._send(endpoint, self.base_url + endpoint, params, headers)
+        except Exception as e:
+            self.instrumentation.record_error(endpoint, type(e).__name__)
+            self._record_outcome(endpoint, False)
+            raise
+        finally:
+            self.instrumentation.phase_end(PHASE_REQUEST, endpoint, token)
+
+        self._record_outcome(endpoint, self._succeeded(response))
+
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None:
+            self.instrumentation.observe(PHASE_SERVER, endpoint, elapsed.total_seconds())
+
+        return response
+
+    def _succeeded(self, response):
+        """
+        :return: False for responses counting as failures of the API, server errors and rate limiting
+        :rtype: bool
+        """
+        return response.status_code < 500 and response.status_code != 429
+
+    def _record_outcome(self, endpoint, success):
+        if self.circuit_breaker is not None and self.circuit_breaker.record(success):
+            self.instrumentation.record_trip(endpoint)
+
+    def _attempt(self, endpoint, url, params, headers):
+        start = time.perf_counter()
+
+        try:
+            return self.transport.get(url, params, headers, timeout=self.timeouts.get(endpoint, self.timeout))
+        finally:
+            # failed and timed out attempts are slow requests too
+            if self.hedging is not None:
+                self.hedging.observe(endpoint, time.perf_counter() - start)
+
+    def _start(self, endpoint, url, params, headers):
+        """
+        Send the primary attempt on a thread of its own, it does not queue behind
+        duplicates on the executor and the caller can wait for whichever attempt
+        answers first
+
+        :rtype: Future
+        """
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._attempt(endpoint, url, params, headers))
+            except Exception as e:
+                future.set_exception(e)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=run, name='climacell-request', daemon=True).start()
+        return future
+
+    def _send(self, endpoint, url, params, headers):
+        delay = self.hedging.delay(endpoint) if self.hedging is not None else None
+
+        if delay is None:
+            return self._attempt(endpoint, url, params, headers)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix='climacell-hedge')
+
+        attempts = [self._start(endpoint, url, params, headers)]
+        done, _ = wait(attempts, timeout=delay)
+
+        if not done:
+            attempts.append(self._executor.submit(self._attempt, endpoint, url, params, headers))
+
+        return self._first_response(endpoint, attempts)
+
+    def _first_response(self, endpoint, attempts):
+        """
+        :return: the response of the attempt answering first, if all attempts fail
+            the exception of the first attempt is raised
+        """
+        pending = set(attempts)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [attempt for attempt in done if attempt.exception() is None]
+
+            if succeeded:
+                if len(attempts) > 1:
+                    self.instrumentation.record_hedge(endpoint, attempts[0] not in succeeded)
+                return succeeded[0].result()
+
+        if len(attempts) > 1:
+            self.instrumentation.record_hedge(endpoint, False)
+
+        return attempts[0].result()
+
+    def close(self):
+        """
+        Stop the threads sending duplicate requests
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
 
     def _forecast(self, endpoint, lat, lon, fields, start_time, end_time, units):
         """
@@ -53,7 +231,7 @@ class Client:
                 params['end_time'] = end_time
 
         response = self._do_request(endpoint, params)
-        return Response(response, fields)
+        return Response(response, fields, endpoint, self.instrumentation)
 
     def hourly(self, lat, lon, fields, start_time='now', end_time=None, units='si'):
         """
@@ -68,7 +246,8 @@ class Client:
         :return: returns an hourly forecast response
         :rtype: Response
         """
-        endpoint = '/weather/forecast/hourly'
+        endpoint = PATHS[ENDPOINT_HOURLY]
+        fields = normalize_fields(fields, ENDPOINT_HOURLY)
         return self._forecast(endpoint, lat, lon, fields, start_time, end_time, units)
 
     def nowcast(self, lat, lon, fields, timestep, start_time='now', end_time=None, units='si'):
@@ -85,6 +264,7 @@ class Client:
         :return: returns a nowcast forecast response
         :rtype: Response
         """
+        fields = normalize_fields(fields, ENDPOINT_NOWCAST)
         params = {
             'lat': lat,
             'lon': lon,
@@ -103,9 +283,9 @@ class Client:
             else:
                 params['end_time'] = end_time
 
-        endpoint = '/weather/nowcast'
+        endpoint = PATHS[ENDPOINT_NOWCAST]
         response = self._do_request(endpoint, params)
-        return Response(response, fields)
+        return Response(response, fields, endpoint, self.instrumentation)
 
     def daily(self, lat, lon, fields, start_time='now', end_time=None, units='si'):
         """
@@ -120,7 +300,8 @@ class Client:
         :return: returns a daily forecast response
         :rtype: Response
         """
-        endpoint = '/weather/forecast/daily'
+        endpoint = PATHS[ENDPOINT_DAILY]
+        fields = normalize_fields(fields, ENDPOINT_DAILY)
         return self._forecast(endpoint, lat, lon, fields, start_time, end_time, units)
 
 
@@ -136,50 +317,75 @@ class Error:
 
 
 class Response:
-    def __init__(self, response, fields):
+    def __init__(self, response, fields, endpoint=None, instrumentation=NOOP):
         """
         :param requests.Response response:
         :param list[str] fields:
+        :param str endpoint: endpoint the response was retrieved from
+        :param climacell.instrumentation.Instrumentation instrumentation: receives decode and parse events
         """
         self.response = response
         self.fields = fields
-        self.json = response.json()
+        self.endpoint = endpoint
+        self.instrumentation = instrumentation
+        self._columns = None
+
+        content = getattr(response, 'content', None)
+        if content is not None:
+            instrumentation.record_bytes(endpoint, len(content))
+
+        token = instrumentation.phase_start(PHASE_DECODE, endpoint)
+
+        try:
+            self.json = response.json()
+        except Exception as e:
+            instrumentation.record_error(endpoint, type(e).__name__)
+            raise
+        finally:
+            instrumentation.phase_end(PHASE_DECODE, endpoint, token)
+
         self.status_code = response.status_code
 
+        if self.has_error:
+            code = self.json.get('errorCode') if isinstance(self.json, dict) else None
+            instrumentation.record_error(endpoint, code)
+
     def get_measurements(self):
         if self.has_error:
             return Error(self.response.json())
 
-        measurements = []
-
-        for item in self.json:
-            for field in self.fields:
-                if isinstance(item[field], list):
-                    # This is a daily forecast, with a min and max observed value
-                    # Todo: better handling of different types of responses
-                    min_measurement = item[field][0]
-                    max_measurement = item[field][1]
-                    min_value = min_measurement['min']['value']
-                    max_value = max_measurement['max']['value']
-                    min_unit = min_measurement['min'].get('units', None)
-                    max_unit = max_measurement['max'].get('units', None)
-                    min_observation_time = min_measurement['observation_time']
-                    max_observation_time = max_measurement['observation_time']
-                    measurements.append(Measurement(field + '_min', min_value, min_unit, min_observation_time))
-                    measurements.append(Measurement(field + '_max', max_value, max_unit, max_observation_time))
-                else:
-                    # Regular measurement
-                    value = item[field]['value']
-
-                    try:
-                        units = item[field]['units']
-                    except KeyError:
-                        units = None
-
-                    observation_time = item['observation_time']['value']
-                    measurements.append(Measurement(field, value, units, observation_time))
-
-        return measurements
+        return self.get_columns().measurements(Measurement)
+
+    def get_columns(self):
+        """
+        Parse the response into columns, one series per field or per aggregate
+        of a daily field. The result is cached on the response.
+
+        :return: the parsed columns or an error
+        :rtype: climacell.parsing.Columns|Error
+        """
+        if self.has_error:
+            return Error(self.response.json())
+
+        if self._columns is None:
+            token = self.instrumentation.phase_start(PHASE_PARSE, self.endpoint)
+
+            try:
+                self._columns = self._parse_columns()
+            except Exception as e:
+                self.instrumentation.record_error(self.endpoint, type(e).__name__)
+                raise
+            finally:
+                self.instrumentation.phase_end(PHASE_PARSE, self.endpoint, token)
+
+        return self._columns
+
+    def _parse_columns(self):
+        if not self.json:
+            return Columns([], [])
+
+        plan = get_plan(self.endpoint, self.fields, self.json[0])
+        return plan.columns(self.json)
 
     @property
     def has_error(self):
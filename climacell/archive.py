@@ -0,0 +1,205 @@
+import bisect
+import json
+import math
+import mmap
+import struct
+from array import array
+
+from climacell.parsing import CODE_TYPE, MISSING, is_numeric
+from climacell.utils import parse_timestamp
+
+MAGIC = b'CCAR'
+VERSION = 1
+
+# magic, version, header length
+PREAMBLE = struct.Struct('<4sHI')
+ALIGNMENT = 8
+
+TIMESTAMP_TYPE = 'q'
+VALUE_TYPE = 'f'
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _stored(columns):
+    """
+    :param climacell.parsing.Columns columns:
+    :return: the series that can be stored: numeric and categorical series
+    :rtype: list[climacell.parsing.Series]
+    """
+    return [s for s in columns.series.values() if s.is_categorical or is_numeric(s.values)]
+
+
+def _merge(columns_list):
+    """
+    Merge columns on their observation times, later columns overwrite the
+    values of earlier columns at the same time.
+
+    :param list[climacell.parsing.Columns] columns_list:
+    :return: the sorted timestamps, values per series name and the series per name
+    :rtype: tuple[list[int], dict, dict]
+    """
+    rows = {}
+    series = {}
+
+    for columns in columns_list:
+        stored = _stored(columns)
+        for s in stored:
+            series.setdefault(s.name, s)
+
+        for i, time in enumerate(columns.times):
+            row = rows.setdefault(int(parse_timestamp(time)), {})
+            for s in stored:
+                row[s.name] = s.values[i]
+
+    timestamps = sorted(rows)
+    values = {}
+
+    for name, s in series.items():
+        if s.is_categorical:
+            column = array(CODE_TYPE, [MISSING]) * len(timestamps)
+            for i, timestamp in enumerate(timestamps):
+                column[i] = rows[timestamp].get(name, MISSING)
+        else:
+            column = array(VALUE_TYPE, [math.nan]) * len(timestamps)
+            for i, timestamp in enumerate(timestamps):
+                value = rows[timestamp].get(name)
+                if value is not None:
+                    column[i] = value
+        values[name] = column
+
+    return timestamps, values, series
+
+
+def write_archive(path, columns_list):
+    """
+    Write response columns to a columnar archive: an int64 array of epoch
+    seconds followed by a float32 array per numeric series and an int16 code
+    array per categorical series, aligned on the observation time of the
+    response items. Missing values are NaN or MISSING.
+
+    :param str path: path of the archive
+    :param list[climacell.parsing.Columns] columns_list: columns of one or more responses
+    """
+    timestamps, values, series = _merge(columns_list)
+    count = len(timestamps)
+
+    header = {
+        'count': count,
+        'series': list(values),
+        'units': {name: s.unit for name, s in series.items()},
+        'typecodes': {name: column.typecode for name, column in values.items()},
+        'dictionaries': {name: list(s.dictionary.values) for name, s in series.items() if s.is_categorical},
+    }
+    header_bytes = json.dumps(header).encode()
+    data_offset = _align(PREAMBLE.size + len(header_bytes))
+
+    with open(path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(bytes(data_offset - f.tell()))
+
+        for column in [array(TIMESTAMP_TYPE, timestamps)] + list(values.values()):
+            f.write(column.tobytes())
+            f.write(bytes(_align(f.tell()) - f.tell()))
+
+
+class Archive:
+    def __init__(self, path):
+        """
+        Memory maps an archive written by write_archive. Timestamps and series
+        are memoryviews into the map, so slicing them does not copy. All
+        slices have to be released before the archive is closed.
+
+        :param str path: path of the archive
+        """
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic, version, header_length = PREAMBLE.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {VERSION} archive')
+
+        header = json.loads(bytes(self._view[PREAMBLE.size:PREAMBLE.size + header_length]))
+        self.count = header['count']
+        self.units = header['units']
+        self.dictionaries = header['dictionaries']
+
+        offset = _align(PREAMBLE.size + header_length)
+        self.timestamps, offset = self._column(offset, TIMESTAMP_TYPE)
+        self.series = {}
+
+        for name in header['series']:
+            self.series[name], offset = self._column(offset, header['typecodes'][name])
+
+    def _column(self, offset, typecode):
+        size = self.count * array(typecode).itemsize
+        column = self._view[offset:offset + size].cast(typecode)
+        return column, _align(offset + size)
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def names(self):
+        return list(self.series)
+
+    def decode(self, name, codes):
+        """
+        :param str name: name of a categorical series
+        :param codes: codes of the series, e.g. a slice
+        :return: the categorical values of the codes
+        :rtype: list[str]
+        """
+        values = self.dictionaries[name]
+        return [None if code == MISSING else values[code] for code in codes]
+
+    def index(self, start=None, end=None):
+        """
+        :param float start: epoch seconds, inclusive
+        :param float end: epoch seconds, exclusive
+        :return: the index range of the timestamps between start and end
+        :rtype: tuple[int, int]
+        """
+        first = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+        last = self.count if end is None else bisect.bisect_left(self.timestamps, end)
+        return first, last
+
+    def slice(self, start=None, end=None, names=None):
+        """
+        Select a time range without copying
+
+        :param float start: epoch seconds, inclusive
+        :param float end: epoch seconds, exclusive
+        :param list[str] names: series to select, defaults to all series
+        :return: the timestamps and the values per series in the range
+        :rtype: tuple[memoryview, dict[str, memoryview]]
+        """
+        first, last = self.index(start, end)
+        names = self.names if names is None else names
+        return self.timestamps[first:last], {name: self.series[name][first:last] for name in names}
+
+    def close(self):
+        if self._mmap.closed:
+            return
+
+        for column in [getattr(self, 'timestamps', None)] + list(getattr(self, 'series', {}).values()):
+            if column is not None:
+                column.release()
+
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
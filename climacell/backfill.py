@@ -0,0 +1,340 @@
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+from climacell.parsing import MISSING, OBSERVATION_TIME, get_plan, is_numeric
+from climacell.utils import parse_timestamp
+
+# Keys of a response item that are not data fields
+ITEM_KEYS = {'lat', 'lon', OBSERVATION_TIME}
+
+DOUBLE_SIZE = array('d').itemsize
+
+
+class ChunkSeries:
+    def __init__(self, name, unit, timestamps, values, dictionary=None):
+        """
+        :param str name: series name, e.g. temp or temp_min
+        :param str unit: unit of the values or None
+        :param timestamps: seconds since the epoch per value
+        :param values: a float sequence (NaN for missing values) or a list for non-numeric series
+        :param list[str] dictionary: values of the codes of a categorical series
+        """
+        self.name = name
+        self.unit = unit
+        self.timestamps = timestamps
+        self.values = values
+        self.dictionary = dictionary
+
+    def decoded(self):
+        """
+        :return: the values, decoded for categorical series
+        :rtype: list
+        """
+        if self.dictionary is None:
+            return self.values
+
+        return [None if value != value else self.dictionary[int(value)] for value in self.values]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ColumnChunk:
+    def __init__(self, source, series, shm=None):
+        """
+        The columns parsed from a single payload. Numeric series are memoryviews
+        into shared memory written by a worker, so the chunk has to be released
+        after the sink consumed it.
+
+        :param str source: path of the payload
+        :param dict[str, ChunkSeries] series: series by name
+        :param shared_memory.SharedMemory shm: the shared memory backing the series
+        """
+        self.source = source
+        self.series = series
+        self.shm = shm
+        self._views = []
+
+    @property
+    def points(self):
+        return sum(len(s) for s in self.series.values())
+
+    def release(self):
+        for view in self._views:
+            view.release()
+
+        self._views = []
+
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class BackfillReport:
+    def __init__(self, files, points, seconds):
+        self.files = files
+        self.points = points
+        self.seconds = seconds
+
+    @property
+    def points_per_second(self):
+        return self.points / self.seconds if self.seconds else 0.0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.files} files, {self.points} points in {self.seconds:.2f}s '
+            f'({self.files_per_second:.1f} files/s, {self.points_per_second:.0f} points/s)'
+        )
+
+
+def _timestamps(times, cache):
+    """
+    Parse observation times, series sharing the same times list are parsed once
+
+    :param list[str] times:
+    :param dict cache: parsed timestamps by id of the times list
+    :return: seconds since the epoch, NaN for missing times
+    :rtype: array
+    """
+    key = id(times)
+
+    if key not in cache:
+        cache[key] = array('d', [math.nan if t is None else parse_timestamp(t) for t in times])
+
+    return cache[key]
+
+
+def parse_payload(path, fields=None):
+    """
+    Parse a raw API payload into columns. Runs in a worker process: numeric
+    series are written to a shared memory block and only their layout is
+    returned to the parent.
+
+    :param str path: path of a JSON payload as returned by the API
+    :param list[str] fields: fields to parse, defaults to all fields in the payload
+    :return: a description of the shared memory layout and the non-numeric series
+    :rtype: dict
+    """
+    with open(path) as f:
+        items = json.load(f)
+
+    result = {'source': path, 'shm': None, 'numeric': [], 'other': []}
+
+    # Error payloads are a single object instead of a list of items
+    if not isinstance(items, list) or not items:
+        return result
+
+    if fields is None:
+        fields = [key for key in items[0] if key not in ITEM_KEYS]
+
+    columns = get_plan(None, fields, items[0]).columns(items)
+    cache = {}
+    numeric = []
+
+    for s in columns.series.values():
+        timestamps = _timestamps(s.times, cache)
+        if s.is_categorical:
+            # Codes are only valid with the dictionary of this worker, which is sent along
+            values = array('d', [math.nan if code == MISSING else code for code in s.values])
+            numeric.append((s.name, s.unit, timestamps, values, list(s.dictionary.values)))
+        elif is_numeric(s.values):
+            values = array('d', [math.nan if value is None else value for value in s.values])
+            numeric.append((s.name, s.unit, timestamps, values, None))
+        else:
+            result['other'].append((s.name, s.unit, timestamps.tolist(), s.values))
+
+    if numeric:
+        size = sum(2 * len(values) for _, _, _, values, _ in numeric) * DOUBLE_SIZE
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        offset = 0
+
+        for name, unit, timestamps, values, dictionary in numeric:
+            for column in (timestamps, values):
+                data = column.tobytes()
+                shm.buf[offset:offset + len(data)] = data
+                offset += len(data)
+            result['numeric'].append((name, unit, len(values), dictionary))
+
+        result['shm'] = shm.name
+        shm.close()
+
+    return result
+
+
+def _chunk(result):
+    """
+    Attach to the shared memory written by parse_payload and wrap it in a chunk
+
+    :param dict result: the result of parse_payload
+    :rtype: ColumnChunk
+    """
+    series = {}
+
+    for name, unit, timestamps, values in result['other']:
+        series[name] = ChunkSeries(name, unit, array('d', timestamps), values)
+
+    if result['shm'] is None:
+        return ColumnChunk(result['source'], series)
+
+    shm = shared_memory.SharedMemory(name=result['shm'])
+    chunk = ColumnChunk(result['source'], series, shm)
+    view = shm.buf.cast('d')
+    chunk._views.append(view)
+    offset = 0
+
+    for name, unit, count, dictionary in result['numeric']:
+        timestamps = view[offset:offset + count]
+        values = view[offset + count:offset + 2 * count]
+        chunk._views.extend([timestamps, values])
+        series[name] = ChunkSeries(name, unit, timestamps, values, dictionary)
+        offset += 2 * count
+
+    return chunk
+
+
+def _submit(executor, pending, paths, fields, window):
+    """
+    Keep at most window payloads in flight, so workers do not create shared
+    memory for payloads far ahead of the sink
+    """
+    while len(pending) < window:
+        path = next(paths, None)
+        if path is None:
+            return
+
+        pending.append(executor.submit(parse_payload, path, fields))
+
+
+def _discard(pending):
+    """
+    Unlink the shared memory of results that were never consumed
+    """
+    for future in pending:
+        if future.cancelled() or future.exception() is not None:
+            continue
+
+        name = future.result()['shm']
+        if name is not None:
+            shm = shared_memory.SharedMemory(name=name)
+            shm.close()
+            shm.unlink()
+
+
+def backfill(paths, sink, fields=None, workers=None, clock=time.perf_counter, window=None):
+    """
+    Parse archived API payloads on a process pool and write the columns to a sink
+
+    :param list[str] paths: paths of JSON payloads
+    :param callable sink: called with every ColumnChunk, which is released afterwards
+    :param list[str] fields: fields to parse, defaults to all fields in every payload
+    :param int workers: number of worker processes, defaults to the number of CPUs
+    :param callable clock: returns the current time in seconds
+    :param int window: maximum number of payloads parsed ahead of the sink, defaults to twice the workers
+    :return: the throughput report
+    :rtype: BackfillReport
+    """
+    start = clock()
+    files = 0
+    points = 0
+    window = window or 2 * (workers or os.cpu_count() or 1)
+    paths = iter(paths)
+    pending = deque()
+
+    # Workers have to share the resource tracker of this process, otherwise
+    # their tracker cleans up the shared memory that is unlinked here
+    resource_tracker.ensure_running()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            try:
+                _submit(executor, pending, paths, fields, window)
+
+                while pending:
+                    result = pending.popleft().result()
+                    _submit(executor, pending, paths, fields, window)
+                    chunk = _chunk(result)
+                    try:
+                        sink(chunk)
+                        points += chunk.points
+                        files += 1
+                    finally:
+                        chunk.release()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        _discard(pending)
+
+    return BackfillReport(files, points, clock() - start)
+
+
+def backfill_directory(directory, sink, pattern='*.json', **kwargs):
+    """
+    Backfill all payloads in a directory, see backfill
+
+    :param str directory: directory containing the payloads
+    :param callable sink: called with every ColumnChunk
+    :param str pattern: glob pattern of the payload files
+    :return: the throughput report
+    :rtype: BackfillReport
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    return backfill(paths, sink, **kwargs)
+
+
+class CsvSink:
+    def __init__(self, file):
+        """
+        Writes chunks as source,name,timestamp,value,unit rows
+
+        :param file: a writable text file
+        """
+        self.writer = csv.writer(file)
+
+    def __call__(self, chunk):
+        for s in chunk.series.values():
+            for timestamp, value in zip(s.timestamps, s.decoded()):
+                self.writer.writerow([chunk.source, s.name, timestamp, value, s.unit])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill archived ClimaCell payloads')
+    parser.add_argument('directory', help='directory containing JSON payloads')
+    parser.add_argument('--pattern', default='*.json', help='glob pattern of the payload files')
+    parser.add_argument('--fields', help='comma separated fields, defaults to all fields')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--output', help='CSV output file, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    fields = args.fields.split(',') if args.fields else None
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+
+    try:
+        report = backfill_directory(
+            args.directory, CsvSink(output), pattern=args.pattern, fields=fields, workers=args.workers
+        )
+    finally:
+        if args.output:
+            output.close()
+
+    print(report, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+from climacell.parsing import MISSING
+
+
+def _is_missing(value, categorical):
+    if categorical:
+        return value == MISSING
+
+    return value is None or value != value
+
+
+def _decode(series, value):
+    """
+    :return: the value as published, decoded for categorical series and None if missing
+    """
+    if series.is_categorical:
+        return series.dictionary.decode(value)
+
+    return None if value is None or value != value else value
+
+
+class SeriesSummary:
+    def __init__(self, name):
+        self.name = name
+        self.inserted = 0
+        self.changed = 0
+        self.dropped = 0
+        self.unchanged = 0
+        self.max_change = 0.0
+        self.total_change = 0.0
+
+    @property
+    def mean_change(self):
+        """
+        :return: mean absolute change of the changed numeric values
+        :rtype: float
+        """
+        return self.total_change / self.changed if self.changed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.name}: +{self.inserted} ~{self.changed} -{self.dropped} '
+            f'(max change {self.max_change:.2f}, mean change {self.mean_change:.2f})'
+        )
+
+
+class Delta:
+    def __init__(self):
+        """
+        Difference between two forecast runs. Points are (name, observation
+        time, value) tuples, changed points also carry the previous value.
+        """
+        self.inserted = []
+        self.changed = []
+        self.dropped = []
+        self.summary = {}
+
+    def __len__(self):
+        return len(self.inserted) + len(self.changed) + len(self.dropped)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def _summary(self, name):
+        if name not in self.summary:
+            self.summary[name] = SeriesSummary(name)
+
+        return self.summary[name]
+
+
+def _compare(delta, series, previous, time, value, old, tolerance):
+    summary = delta._summary(series.name)
+    categorical = series.is_categorical
+
+    if _is_missing(value, categorical) and _is_missing(old, categorical):
+        summary.unchanged += 1
+    elif _is_missing(old, categorical):
+        delta.inserted.append((series.name, time, _decode(series, value)))
+        summary.inserted += 1
+    elif _is_missing(value, categorical):
+        delta.dropped.append((series.name, time, _decode(previous, old)))
+        summary.dropped += 1
+    elif categorical or not isinstance(value, (int, float)):
+        # categorical codes and other values, e.g. sunrise times, are compared by equality
+        if value != old:
+            delta.changed.append((series.name, time, _decode(previous, old), _decode(series, value)))
+            summary.changed += 1
+        else:
+            summary.unchanged += 1
+    elif abs(value - old) > tolerance:
+        change = abs(value - old)
+        delta.changed.append((series.name, time, old, value))
+        summary.changed += 1
+        summary.total_change += change
+        summary.max_change = max(summary.max_change, change)
+    else:
+        summary.unchanged += 1
+
+
+def _missing_value(series):
+    return MISSING if series.is_categorical else None
+
+
+def diff(previous, current, tolerances=None, default_tolerance=0.0):
+    """
+    Compare two forecast runs for the same location and fields, keyed by the
+    observation time of the response items
+
+    :param climacell.parsing.Columns previous: columns of the previous run or None
+    :param climacell.parsing.Columns current: columns of the new run
+    :param dict[str, float] tolerances: absolute tolerance per field, changes
+        within the tolerance are not reported
+    :param float default_tolerance: tolerance of fields without a tolerance
+    :return: the inserted, changed and dropped points
+    :rtype: Delta
+    """
+    tolerances = tolerances or {}
+    delta = Delta()
+    previous_series = previous.series if previous is not None else {}
+    previous_index = {time: i for i, time in enumerate(previous.times)} if previous is not None else {}
+    current_times = set(current.times)
+
+    for name, series in current.series.items():
+        old_series = previous_series.get(name, series)
+        tolerance = tolerances.get(series.field, default_tolerance)
+        missing = _missing_value(series)
+        has_previous = name in previous_series
+
+        for i, time in enumerate(current.times):
+            j = previous_index.get(time) if has_previous else None
+            old = old_series.values[j] if j is not None else missing
+            _compare(delta, series, old_series, time, series.values[i], old, tolerance)
+
+    for name, series in previous_series.items():
+        in_current = name in current.series
+
+        for j, time in enumerate(previous.times):
+            if in_current and time in current_times:
+                continue
+
+            value = series.values[j]
+            if not _is_missing(value, series.is_categorical):
+                delta.dropped.append((name, time, _decode(series, value)))
+                delta._summary(name).dropped += 1
+
+    return delta
+
+
+class DeltaPublisher:
+    def __init__(self, sink, tolerances=None, default_tolerance=0.0):
+        """
+        Keeps the previous run per key and only publishes the difference with it
+
+        :param callable sink: called with the key and the Delta if anything changed
+        :param dict[str, float] tolerances: absolute tolerance per field
+        :param float default_tolerance: tolerance of fields without a tolerance
+        """
+        self.sink = sink
+        self.tolerances = tolerances
+        self.default_tolerance = default_tolerance
+        self._previous = {}
+
+    def publish(self, key, columns):
+        """
+        :param key: identifies the run, e.g. (location, endpoint, fields)
+        :param climacell.parsing.Columns columns: columns of the new run
+        :return: the difference with the previous run for the key
+        :rtype: Delta
+        """
+        delta = diff(self._previous.get(key), columns, self.tolerances, self.default_tolerance)
+        self._previous[key] = columns
+
+        if delta:
+            self.sink(key, delta)
+
+        return delta
@@ -1,3 +1,5 @@
+from collections import namedtuple
+
 # Core layer
 FIELD_TEMP = 'temp'
 FIELD_FEELS_LIKE = 'feels_like'
@@ -111,3 +113,123 @@ ROAD_LAYER = [
 FIRE_LAYER = [FIELD_FIRE_INDEX]
 
 INSURANCE_LAYER = [FIELD_HAIL_BINARY]
+
+# Endpoints
+ENDPOINT_NOWCAST = 'nowcast'
+ENDPOINT_HOURLY = 'hourly'
+ENDPOINT_DAILY = 'daily'
+
+ALL_ENDPOINTS = (ENDPOINT_NOWCAST, ENDPOINT_HOURLY, ENDPOINT_DAILY)
+FORECAST_ENDPOINTS = (ENDPOINT_NOWCAST, ENDPOINT_HOURLY)
+
+# Value types
+TYPE_NUMERIC = 'numeric'
+TYPE_CATEGORICAL = 'categorical'
+TYPE_TIMESTAMP = 'timestamp'
+
+# Unit families, the actual unit depends on the requested unit system
+UNIT_TEMPERATURE = 'temperature'
+UNIT_PERCENTAGE = 'percentage'
+UNIT_SPEED = 'speed'
+UNIT_DIRECTION = 'direction'
+UNIT_PRESSURE = 'pressure'
+UNIT_PRECIPITATION_RATE = 'precipitation_rate'
+UNIT_PRECIPITATION_DEPTH = 'precipitation_depth'
+UNIT_DISTANCE = 'distance'
+UNIT_IRRADIANCE = 'irradiance'
+UNIT_CONCENTRATION = 'concentration'
+
+# Aggregates of daily fields
+MIN_MAX = ('min', 'max')
+MAX = ('max',)
+
+
+class FieldSpec(namedtuple('FieldSpec', ['name', 'dtype', 'unit_family', 'daily_aggregates', 'endpoints'])):
+    """
+    :param str name: field name as used by the API
+    :param str dtype: one of the TYPE_ constants
+    :param str unit_family: one of the UNIT_ constants or None for unitless fields
+    :param tuple[str] daily_aggregates: aggregates returned by the daily endpoint, empty for a single value
+    :param tuple[str] endpoints: endpoints the field is available on
+    """
+    __slots__ = ()
+
+
+CATALOG = {spec.name: spec for spec in [
+    FieldSpec(FIELD_TEMP, TYPE_NUMERIC, UNIT_TEMPERATURE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_FEELS_LIKE, TYPE_NUMERIC, UNIT_TEMPERATURE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_DEW_POINT, TYPE_NUMERIC, UNIT_TEMPERATURE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_HUMIDITY, TYPE_NUMERIC, UNIT_PERCENTAGE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_WIND_SPEED, TYPE_NUMERIC, UNIT_SPEED, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_WIND_DIRECTION, TYPE_NUMERIC, UNIT_DIRECTION, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_WIND_GUST, TYPE_NUMERIC, UNIT_SPEED, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_BAROMETRIC_PRESSURE, TYPE_NUMERIC, UNIT_PRESSURE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_PRECIPITATION, TYPE_NUMERIC, UNIT_PRECIPITATION_RATE, MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_PRECIPITATION_TYPE, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_PRECIPITATION_PROBABILITY, TYPE_NUMERIC, UNIT_PERCENTAGE, (), (ENDPOINT_HOURLY, ENDPOINT_DAILY)),
+    FieldSpec(FIELD_PRECIPITATION_ACCUMULATION, TYPE_NUMERIC, UNIT_PRECIPITATION_DEPTH, (), (ENDPOINT_HOURLY, ENDPOINT_DAILY)),
+    FieldSpec(FIELD_SUNRISE, TYPE_TIMESTAMP, None, (), ALL_ENDPOINTS),
+    FieldSpec(FIELD_SUNSET, TYPE_TIMESTAMP, None, (), ALL_ENDPOINTS),
+    FieldSpec(FIELD_VISIBILITY, TYPE_NUMERIC, UNIT_DISTANCE, MIN_MAX, ALL_ENDPOINTS),
+    FieldSpec(FIELD_CLOUD_COVER, TYPE_NUMERIC, UNIT_PERCENTAGE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_CLOUD_BASE, TYPE_NUMERIC, UNIT_DISTANCE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_CLOUD_CEILING, TYPE_NUMERIC, UNIT_DISTANCE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_CLOUD_SATELLITE, TYPE_NUMERIC, UNIT_PERCENTAGE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_SURFACE_SHORTWAVE_RADIATION, TYPE_NUMERIC, UNIT_IRRADIANCE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_MOON_PHASE, TYPE_CATEGORICAL, None, (), ALL_ENDPOINTS),
+    FieldSpec(FIELD_WEATHER_CODE, TYPE_CATEGORICAL, None, (), ALL_ENDPOINTS),
+    FieldSpec(FIELD_WEATHER_GROUPS, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_PARTICLE_MATTER25, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_PARTICLE_MATTER10, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_OZONE, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_NITROGEN_DIOXIDE, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_CARBON_MONOXIDE, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_SULFUR_DIOXIDE, TYPE_NUMERIC, UNIT_CONCENTRATION, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_AIR_QUALITY_INDEX_EPA, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_PRIMARY_POLLUTANT_EPA, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_HEALTH_CONCERN_EPA, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_AIR_QUALITY_INDEX_CHINA_MEP, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_PRIMARY_POLLUTANT_CHINA_MEP, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_HEALTH_CONCERN_CHINA_MEP, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_TREE_POLLEN, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_WEED_POLLEN, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_GRASS_POLLEN, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_ROAD_RISK_SCORE, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_ROAD_RISK, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_ROAD_RISK_CONFIDENCE, TYPE_NUMERIC, UNIT_PERCENTAGE, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_ROAD_RISK_CONDITIONS, TYPE_CATEGORICAL, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_FIRE_INDEX, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+    FieldSpec(FIELD_HAIL_BINARY, TYPE_NUMERIC, None, (), FORECAST_ENDPOINTS),
+]}
+
+FIELD_TYPES = {name: spec.dtype for name, spec in CATALOG.items()}
+
+
+def normalize_fields(fields, endpoint):
+    """
+    Validate the requested fields against the catalog before any request is
+    made. Field names are stripped and lowercased, duplicates are removed.
+
+    :param list[str] fields: requested data fields
+    :param str endpoint: one of the ENDPOINT_ constants
+    :return: the normalized fields
+    :rtype: list[str]
+    """
+    normalized = []
+
+    for field in fields:
+        field = field.strip().lower()
+        spec = CATALOG.get(field)
+
+        if spec is None:
+            raise ValueError(f'Unknown field {field}')
+        if endpoint not in spec.endpoints:
+            raise ValueError(f'Field {field} is not available on the {endpoint} endpoint')
+
+        if field not in normalized:
+            normalized.append(field)
+
+    if not normalized:
+        raise ValueError('No fields provided')
+
+    return normalized
@@ -0,0 +1,340 @@
+import json
+import math
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from climacell.aggregation import downsample
+from climacell.api import Error
+from climacell.fields import ENDPOINT_NOWCAST
+from climacell.parsing import is_numeric
+from climacell.utils import parse_timestamp
+
+
+class DatasourceError(Exception):
+    pass
+
+
+def parse_target(target):
+    """
+    Split a target of the form location:endpoint:field
+
+    :param str target: e.g. amsterdam:hourly:temp
+    :return: location, endpoint and field
+    :rtype: tuple[str, str, str]
+    """
+    parts = target.split(':')
+
+    if len(parts) != 3:
+        raise ValueError(f'Invalid target {target}, expected location:endpoint:field')
+
+    return parts[0], parts[1], parts[2]
+
+
+class Datasource:
+    def __init__(self, source, locations, fields, timestep=5, cache_ttl=10, quantum=60, clock=time.monotonic):
+        """
+        Answers Grafana JSON datasource requests from a Client or a cache
+        with the same interface, e.g. StaleWhileRevalidate
+
+        :param source: object with hourly, nowcast and daily methods like Client
+        :param dict[str, tuple[float, float]] locations: lat and lon by location name
+        :param dict[str, list[str]] fields: fields to request per endpoint
+        :param int timestep: nowcast timestep in minutes
+        :param float cache_ttl: seconds query results are cached
+        :param float quantum: query ranges are rounded to this many seconds for the result cache
+        :param callable clock: returns the current time in seconds
+        """
+        self.source = source
+        self.locations = locations
+        self.fields = fields
+        self.timestep = timestep
+        self.cache_ttl = cache_ttl
+        self.quantum = quantum
+        self.clock = clock
+        self._results = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def search(self, body):
+        """
+        :param dict body: search request
+        :return: all targets, filtered by the requested target
+        :rtype: list[str]
+        """
+        query = body.get('target', '') or ''
+        targets = [
+            f'{location}:{endpoint}:{field}'
+            for location in self.locations
+            for endpoint, fields in self.fields.items()
+            for field in fields
+        ]
+
+        return [target for target in targets if query in target]
+
+    def _range(self, body):
+        """
+        :return: the start and end of the requested range in epoch seconds
+        :rtype: tuple[float, float]
+        """
+        requested = body.get('range', {})
+        start = parse_timestamp(requested['from']) if 'from' in requested else float('-inf')
+        end = parse_timestamp(requested['to']) if 'to' in requested else float('inf')
+        return start, end
+
+    def _columns(self, location, endpoint):
+        """
+        Retrieve the columns for a location and endpoint, always requesting all
+        configured fields so that the targets of a query share a single source call
+        """
+        if location not in self.locations:
+            raise ValueError(f'Unknown location {location}')
+        if endpoint not in self.fields:
+            raise ValueError(f'Unknown endpoint {endpoint}')
+
+        lat, lon = self.locations[location]
+
+        try:
+            if endpoint == ENDPOINT_NOWCAST:
+                response = self.source.nowcast(lat, lon, self.fields[endpoint], self.timestep)
+            else:
+                response = getattr(self.source, endpoint)(lat, lon, self.fields[endpoint])
+        except (ValueError, KeyError):
+            raise
+        except Exception as e:
+            # e.g. timeouts, connection errors, an open circuit or no available API key
+            raise DatasourceError(f'{type(e).__name__}: {e}') from e
+
+        columns = response.get_columns()
+
+        if isinstance(columns, Error):
+            raise DatasourceError(str(columns))
+
+        return columns
+
+    def _series(self, target, start, end, fetched=None):
+        """
+        :param dict fetched: columns retrieved earlier in the request by location and endpoint
+        :return: name, field, timestamps and values of the series of a target
+            within the range, daily fields return a series per aggregate
+        :rtype: list[tuple[str, str, list[float], list]]
+        """
+        location, endpoint, field = parse_target(target)
+        fetched = {} if fetched is None else fetched
+
+        if (location, endpoint) not in fetched:
+            fetched[location, endpoint] = self._columns(location, endpoint)
+
+        columns = fetched[location, endpoint]
+        result = []
+
+        for s in columns.series.values():
+            if s.name != field and s.field != field:
+                continue
+
+            timestamps = []
+            values = []
+
+            for time_str, value in zip(s.times, s.decoded()):
+                if time_str is None:
+                    continue
+
+                timestamp = parse_timestamp(time_str)
+                if start <= timestamp <= end:
+                    timestamps.append(timestamp)
+                    values.append(value)
+
+            result.append((s.name, s.field, timestamps, values))
+
+        return result
+
+    def _cache_key(self, kind, body):
+        start, end = self._range(body)
+        targets = tuple(target.get('target') for target in body.get('targets', []))
+        annotation = (body.get('annotation') or {}).get('query')
+        # open ends of the range are infinite, dividing them would give NaN which never matches
+        return (
+            kind, targets, annotation, body.get('maxDataPoints'),
+            start // self.quantum if math.isfinite(start) else start,
+            end // self.quantum if math.isfinite(end) else end,
+        )
+
+    def _cached(self, kind, body, compute):
+        """
+        Answer from the result cache, concurrent identical requests wait for a
+        single computation
+        """
+        key = self._cache_key(kind, body)
+        now = self.clock()
+
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                computing = False
+            else:
+                computing = True
+                future = self._inflight[key] = Future()
+
+        if not computing:
+            return future.result()
+
+        try:
+            result = compute(body)
+        except Exception as e:
+            self._done(key)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            self._results[key] = (now + self.cache_ttl, result)
+
+        self._done(key)
+        future.set_result(result)
+        return result
+
+    def _done(self, key):
+        with self._lock:
+            del self._inflight[key]
+
+    def query(self, body):
+        """
+        :param dict body: query request
+        :return: a timeserie per target and daily aggregate
+        :rtype: list[dict]
+        """
+        return self._cached('query', body, self._query)
+
+    def _query(self, body):
+        start, end = self._range(body)
+        max_points = body.get('maxDataPoints', 0)
+        fetched = {}
+        result = []
+
+        for target in body.get('targets', []):
+            prefix = target['target'].rsplit(':', 1)[0]
+            for name, field, timestamps, values in self._series(target['target'], start, end, fetched):
+                if not is_numeric(values):
+                    continue
+
+                timestamps, values = downsample(name, timestamps, values, max_points, field)
+                result.append({
+                    'target': f'{prefix}:{name}',
+                    'datapoints': [[value, int(timestamp * 1000)] for timestamp, value in zip(timestamps, values)],
+                })
+
+        return result
+
+    def annotations(self, body):
+        """
+        Annotations for fields with timestamp values, e.g. amsterdam:hourly:sunrise
+
+        :param dict body: annotations request
+        :return: an annotation per value
+        :rtype: list[dict]
+        """
+        return self._cached('annotations', body, self._annotations)
+
+    def _annotations(self, body):
+        start, end = self._range(body)
+        annotation = body['annotation']
+        location = parse_target(annotation['query'])[0]
+        result = []
+
+        for name, _, _, values in self._series(annotation['query'], float('-inf'), float('inf')):
+            for value in values:
+                if value is None:
+                    continue
+
+                timestamp = parse_timestamp(value)
+                if start <= timestamp <= end:
+                    result.append({
+                        'annotation': annotation,
+                        'time': int(timestamp * 1000),
+                        'title': name,
+                        'text': f'{name} at {location}',
+                        'tags': [location, name],
+                    })
+
+        return result
+
+
+class DatasourceHandler(BaseHTTPRequestHandler):
+    datasource = None
+    routes = {
+        '/search': 'search',
+        '/query': 'query',
+        '/annotations': 'annotations',
+    }
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/':
+            self._send(200, 'OK')
+        else:
+            self._send(404, {'message': 'Not found'})
+
+    def do_POST(self):
+        route = self.routes.get(self.path)
+
+        if route is None:
+            self._send(404, {'message': 'Not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            self._send(200, getattr(self.datasource, route)(body))
+        except (ValueError, KeyError) as e:
+            self._send(400, {'message': str(e)})
+        except DatasourceError as e:
+            self._send(502, {'message': str(e)})
+        except Exception as e:
+            self._send(500, {'message': f'{type(e).__name__}: {e}'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(datasource, host='0.0.0.0', port=3003):
+    """
+    Create a Grafana JSON datasource HTTP server
+
+    :param Datasource datasource: datasource answering the requests
+    :param str host: host to bind to
+    :param int port: port to bind to
+    :rtype: ThreadingHTTPServer
+    """
+    handler = type('Handler', (DatasourceHandler,), {'datasource': datasource})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(datasource, host='0.0.0.0', port=3003):
+    """
+    Serve a Grafana JSON datasource until interrupted
+
+    :param Datasource datasource: datasource answering the requests
+    :param str host: host to bind to
+    :param int port: port to bind to
+    """
+    server = make_server(datasource, host, port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
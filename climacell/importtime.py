@@ -0,0 +1,99 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+def parse_importtime(output):
+    """
+    Parse the output of python -X importtime
+
+    :param str output: stderr of the interpreter
+    :return: self and cumulative microseconds of every imported module
+    :rtype: dict[str, tuple[int, int]]
+    """
+    modules = {}
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own), int(cumulative))
+
+    return modules
+
+
+def measure(module, runs=5, python=sys.executable):
+    """
+    Import a module in fresh interpreters
+
+    :param str module: module to import
+    :param int runs: number of interpreters
+    :param str python: interpreter to run
+    :return: median cumulative milliseconds of the import and all modules it imported
+    :rtype: tuple[float, set[str]]
+    """
+    timings = []
+    imported = set()
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [python, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True
+        )
+        modules = parse_importtime(result.stderr)
+        imported |= set(modules)
+        timings.append(modules.get(module, (0, 0))[1] / 1000)
+
+    return statistics.median(timings), imported
+
+
+def check(budget, runs=5, python=sys.executable):
+    """
+    :param dict budget: max_ms and forbidden modules per module
+    :param int runs: number of interpreters per module
+    :param str python: interpreter to run
+    :return: the measured milliseconds per module and the budget violations
+    :rtype: tuple[dict[str, float], list[str]]
+    """
+    timings = {}
+    violations = []
+
+    for module, limits in budget.items():
+        milliseconds, imported = measure(module, runs, python)
+        timings[module] = milliseconds
+
+        if milliseconds > limits['max_ms']:
+            violations.append(f'{module} imports in {milliseconds:.1f}ms, budget is {limits["max_ms"]}ms')
+
+        for forbidden in limits.get('forbidden', []):
+            pulled = sorted(name for name in imported if name == forbidden or name.startswith(forbidden + '.'))
+            if pulled:
+                violations.append(f'{module} imports {", ".join(pulled)}')
+
+    return timings, violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check module import times against a budget')
+    parser.add_argument('--budget', default='importtime.json', help='JSON file with the budget per module')
+    parser.add_argument('--runs', type=int, default=5, help='number of interpreters per module')
+    args = parser.parse_args(argv)
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    timings, violations = check(budget, args.runs)
+
+    for module, milliseconds in timings.items():
+        print(f'{module}: {milliseconds:.1f}ms (budget {budget[module]["max_ms"]}ms)')
+
+    for violation in violations:
+        print(violation, file=sys.stderr)
+
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
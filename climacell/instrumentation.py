@@ -0,0 +1,268 @@
+import bisect
+import time
+from collections import Counter
+
+# Phases of a single request lifecycle. The 'request' phase covers the whole
+# round trip done by requests (DNS, TLS, server time and body download), the
+# 'server' phase is the part of it until the response headers were parsed.
+# requests does not expose DNS and TLS timings separately.
+PHASE_REQUEST = 'request'
+PHASE_SERVER = 'server'
+PHASE_DECODE = 'decode'
+PHASE_PARSE = 'parse'
+
+PHASES = [PHASE_REQUEST, PHASE_SERVER, PHASE_DECODE, PHASE_PARSE]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, float('inf'),
+)
+
+
+class Instrumentation:
+    """
+    No-op instrumentation, used by default by Client and Response. Subclasses
+    override the hooks they are interested in.
+    """
+
+    def phase_start(self, phase, endpoint):
+        """
+        Called when a phase starts
+
+        :param str phase: one of PHASES
+        :param str endpoint: endpoint of the request
+        :return: a token that is passed to phase_end
+        """
+        return None
+
+    def phase_end(self, phase, endpoint, token):
+        """
+        Called when a phase ends
+
+        :param str phase: one of PHASES
+        :param str endpoint: endpoint of the request
+        :param token: the token returned by phase_start
+        """
+
+    def observe(self, phase, endpoint, seconds):
+        """
+        Record a duration that was measured outside of phase_start and phase_end
+
+        :param str phase: one of PHASES
+        :param str endpoint: endpoint of the request
+        :param float seconds: duration of the phase
+        """
+
+    def record_bytes(self, endpoint, size):
+        """
+        Record the size of a response body
+
+        :param str endpoint: endpoint of the request
+        :param int size: body size in bytes
+        """
+
+    def record_error(self, endpoint, code):
+        """
+        Record an error response or a request that failed without one
+
+        :param str endpoint: endpoint of the request
+        :param str code: the Error.code of the response, or the name of the
+            exception raised by the transport, e.g. ConnectionError
+        """
+
+    def record_hedge(self, endpoint, won):
+        """
+        Record that a duplicate request was sent because the first one was slow
+
+        :param str endpoint: endpoint of the request
+        :param bool won: whether the duplicate answered first
+        """
+
+    def record_trip(self, endpoint):
+        """
+        Record that the circuit breaker opened
+
+        :param str endpoint: endpoint of the request that opened the circuit
+        """
+
+
+NOOP = Instrumentation()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param tuple[float] buckets: sorted upper bounds of the buckets
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by returning the upper bound of the bucket it falls in
+
+        :param float q: quantile between 0 and 1
+        :return: the estimated quantile or None if nothing was observed
+        :rtype: float
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+
+        return self.buckets[-1]
+
+
+class MetricsInstrumentation(Instrumentation):
+    """
+    Keeps latency histograms per endpoint and phase, byte counts per endpoint,
+    error counts per Error.code and hedge and circuit breaker counts in memory
+    """
+
+    def __init__(self, clock=time.perf_counter, buckets=DEFAULT_BUCKETS):
+        """
+        :param callable clock: returns the current time in seconds
+        :param tuple[float] buckets: histogram bucket upper bounds
+        """
+        self.clock = clock
+        self.buckets = buckets
+        self.histograms = {}
+        self.bytes = Counter()
+        self.errors = Counter()
+        self.hedges = Counter()
+        self.hedge_wins = Counter()
+        self.trips = Counter()
+
+    def histogram(self, endpoint, phase):
+        """
+        :param str endpoint:
+        :param str phase:
+        :return: the histogram for the endpoint and phase
+        :rtype: Histogram
+        """
+        key = (endpoint, phase)
+
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.buckets)
+
+        return self.histograms[key]
+
+    def phase_start(self, phase, endpoint):
+        return self.clock()
+
+    def phase_end(self, phase, endpoint, token):
+        self.observe(phase, endpoint, self.clock() - token)
+
+    def observe(self, phase, endpoint, seconds):
+        self.histogram(endpoint, phase).observe(seconds)
+
+    def record_bytes(self, endpoint, size):
+        self.bytes[endpoint] += size
+
+    def record_error(self, endpoint, code):
+        self.errors[code] += 1
+
+    def record_hedge(self, endpoint, won):
+        self.hedges[endpoint] += 1
+        if won:
+            self.hedge_wins[endpoint] += 1
+
+    def record_trip(self, endpoint):
+        self.trips[endpoint] += 1
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Exports the lifecycle metrics with prometheus_client, which has to be installed
+    """
+
+    def __init__(self, registry=None, namespace='climacell', clock=time.perf_counter):
+        """
+        :param registry: prometheus_client registry, defaults to the global registry
+        :param str namespace: metric name prefix
+        :param callable clock: returns the current time in seconds
+        """
+        import prometheus_client
+
+        kwargs = {'namespace': namespace}
+        if registry is not None:
+            kwargs['registry'] = registry
+
+        self.clock = clock
+        self.latency = prometheus_client.Histogram(
+            'phase_seconds', 'Request lifecycle phase latency', ['endpoint', 'phase'], **kwargs
+        )
+        self.response_bytes = prometheus_client.Counter(
+            'response_bytes', 'Response body bytes', ['endpoint'], **kwargs
+        )
+        self.error_count = prometheus_client.Counter(
+            'errors', 'Error responses by error code', ['endpoint', 'code'], **kwargs
+        )
+        self.hedge_count = prometheus_client.Counter(
+            'hedges', 'Duplicate requests sent for slow requests', ['endpoint', 'won'], **kwargs
+        )
+        self.trip_count = prometheus_client.Counter(
+            'circuit_trips', 'Times the circuit breaker opened', ['endpoint'], **kwargs
+        )
+
+    def phase_start(self, phase, endpoint):
+        return self.clock()
+
+    def phase_end(self, phase, endpoint, token):
+        self.observe(phase, endpoint, self.clock() - token)
+
+    def observe(self, phase, endpoint, seconds):
+        self.latency.labels(endpoint=endpoint, phase=phase).observe(seconds)
+
+    def record_bytes(self, endpoint, size):
+        self.response_bytes.labels(endpoint=endpoint).inc(size)
+
+    def record_error(self, endpoint, code):
+        self.error_count.labels(endpoint=endpoint, code=code).inc()
+
+    def record_hedge(self, endpoint, won):
+        self.hedge_count.labels(endpoint=endpoint, won=str(won).lower()).inc()
+
+    def record_trip(self, endpoint):
+        self.trip_count.labels(endpoint=endpoint).inc()
+
+
+class TracerInstrumentation(Instrumentation):
+    """
+    Creates a span per phase on an OpenTelemetry style tracer, which has a
+    start_span(name, attributes=...) method returning spans with an end() method
+    """
+
+    def __init__(self, tracer, prefix='climacell'):
+        """
+        :param tracer: OpenTelemetry style tracer
+        :param str prefix: span name prefix
+        """
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def phase_start(self, phase, endpoint):
+        return self.tracer.start_span(f'{self.prefix}.{phase}', attributes={'endpoint': endpoint})
+
+    def phase_end(self, phase, endpoint, token):
+        token.end()
+
+    def record_error(self, endpoint, code):
+        span = self.tracer.start_span(f'{self.prefix}.error', attributes={'endpoint': endpoint, 'code': code})
+        span.end()
@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from climacell.api import Client
+from climacell.resilience import CircuitOpenError
+
+RATE_LIMIT_HEADER = 'x-ratelimit-remaining'
+
+STATUS_UNAUTHORIZED = 401
+STATUS_FORBIDDEN = 403
+STATUS_RATE_LIMITED = 429
+
+
+class NoKeyAvailableError(Exception):
+    pass
+
+
+def remaining_quota(headers):
+    """
+    :param dict headers: response headers
+    :return: the lowest X-RateLimit-Remaining value, e.g. of the hourly and daily limits,
+        None without rate limit headers
+    :rtype: int
+    """
+    values = [
+        int(value) for name, value in headers.items()
+        if name.lower().startswith(RATE_LIMIT_HEADER) and str(value).strip().isdigit()
+    ]
+
+    return min(values) if values else None
+
+
+class KeyState:
+    def __init__(self, key):
+        """
+        :param str key: ClimaCell api key
+        """
+        self.key = key
+        self.remaining = None
+        self.used = 0
+        self.errors = Counter()
+        self.unavailable_until = None
+
+    def __repr__(self):
+        return f'KeyState(...{self.key[-4:]}, remaining={self.remaining}, used={self.used})'
+
+
+class KeyPool:
+    def __init__(self, keys, rate_limited_cooldown=60, revoked_cooldown=3600, clock=time.monotonic, seed=None):
+        """
+        Spreads requests over API keys weighted by their remaining quota. Rate
+        limited, exhausted and rejected keys are taken out of rotation for a while.
+
+        :param list[str] keys: ClimaCell api keys
+        :param float rate_limited_cooldown: seconds a rate limited or exhausted key is not used
+        :param float revoked_cooldown: seconds a key rejected with 401 or 403 is not used
+        :param callable clock: returns the current time in seconds
+        :param int seed: seed of the key selection
+        """
+        if not keys:
+            raise ValueError('At least one API key is required')
+
+        self.keys = [KeyState(key) for key in keys]
+        self.rate_limited_cooldown = rate_limited_cooldown
+        self.revoked_cooldown = revoked_cooldown
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def available(self):
+        """
+        :return: the keys in rotation
+        :rtype: list[KeyState]
+        """
+        now = self.clock()
+
+        with self._lock:
+            for state in self.keys:
+                if state.unavailable_until is not None and state.unavailable_until <= now:
+                    # the quota is unknown again once the key is back
+                    state.unavailable_until = None
+                    state.remaining = None
+
+            return [state for state in self.keys if state.unavailable_until is None]
+
+    def choose(self):
+        """
+        Pick a key, the chance of a key is proportional to its remaining quota.
+        Keys without a known quota are weighted like the key with the most quota left.
+
+        :rtype: KeyState
+        """
+        available = self.available()
+
+        if not available:
+            raise NoKeyAvailableError('All API keys are rate limited, exhausted or revoked')
+
+        known = [state.remaining for state in available if state.remaining is not None]
+        unknown = max(known, default=0) or 1
+        weights = [unknown if state.remaining is None else state.remaining for state in available]
+
+        with self._lock:
+            state = self._random.choices(available, weights)[0]
+            state.used += 1
+
+        return state
+
+    def record(self, state, status_code, headers):
+        """
+        Update the quota of a key from a response
+
+        :param KeyState state: the key used for the request
+        :param int status_code: status code of the response
+        :param dict headers: headers of the response
+        """
+        remaining = remaining_quota(headers)
+
+        with self._lock:
+            if remaining is not None:
+                state.remaining = remaining
+
+            if status_code != 200:
+                state.errors[status_code] += 1
+
+            if status_code in (STATUS_UNAUTHORIZED, STATUS_FORBIDDEN):
+                state.unavailable_until = self.clock() + self.revoked_cooldown
+            elif status_code == STATUS_RATE_LIMITED or state.remaining == 0:
+                state.unavailable_until = self.clock() + self.rate_limited_cooldown
+
+    def record_exception(self, state, exception):
+        with self._lock:
+            state.errors[type(exception).__name__] += 1
+
+
+class PooledClient(Client):
+    def __init__(self, keys, **kwargs):
+        """
+        A Client spreading its requests over several API keys. Wrap it in a
+        StaleWhileRevalidate to share the cache and request coalescing across keys.
+
+        :param keys: ClimaCell api keys or a KeyPool
+        :param kwargs: Client arguments
+        """
+        self.pool = keys if isinstance(keys, KeyPool) else KeyPool(keys)
+        super().__init__(None, **kwargs)
+
+    def _do_request(self, endpoint, params):
+        """
+        Execute the request with a key from the pool, requests rejected because
+        of the key are retried once per key with another key
+        """
+        for _ in range(len(self.pool.keys)):
+            state = self.pool.choose()
+
+            try:
+                response = self._request(endpoint, params, state.key)
+            except CircuitOpenError:
+                # nothing was sent with the key
+                raise
+            except Exception as e:
+                self.pool.record_exception(state, e)
+                raise
+
+            self.pool.record(state, response.status_code, getattr(response, 'headers', None) or {})
+
+            if response.status_code not in (STATUS_UNAUTHORIZED, STATUS_FORBIDDEN, STATUS_RATE_LIMITED):
+                break
+            if not self.pool.available():
+                break
+
+        return response
+
+    def _succeeded(self, response):
+        """
+        Rate limited, exhausted and rejected keys are handled by the pool, they
+        do not count as failures of the API for the circuit breaker
+        """
+        return response.status_code < 500
@@ -0,0 +1,159 @@
+import argparse
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from climacell.api import BASE_URL, Client
+from climacell.serving import StaleWhileRevalidate
+from climacell.stub import StubServer, synthetic_forecast
+from climacell.transport import load_recording
+
+# Recorded paths include the path of the API url
+API_PATH = urlparse(BASE_URL).path
+HOURLY_PATH = API_PATH + '/weather/forecast/hourly'
+
+
+def percentile(values, q):
+    """
+    :param list[float] values: values sorted ascending
+    :param float q: quantile between 0 and 1
+    :return: the nearest-rank percentile, NaN without values
+    :rtype: float
+    """
+    if not values:
+        return math.nan
+
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+class LoadReport:
+    def __init__(self, latencies, errors, seconds):
+        """
+        :param list[float] latencies: seconds every call took
+        :param Counter errors: failed calls by status code or exception name
+        :param float seconds: duration of the run
+        """
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def calls(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.calls / self.seconds if self.seconds else 0.0
+
+    @property
+    def p50(self):
+        return percentile(self.latencies, 0.5)
+
+    @property
+    def p95(self):
+        return percentile(self.latencies, 0.95)
+
+    @property
+    def p99(self):
+        return percentile(self.latencies, 0.99)
+
+    def __str__(self):
+        errors = ', '.join(f'{code}: {count}' for code, count in sorted(self.errors.items(), key=str))
+        return (
+            f'{self.calls} calls in {self.seconds:.2f}s ({self.throughput:.1f} calls/s), '
+            f'p50 {self.p50 * 1000:.1f}ms, p95 {self.p95 * 1000:.1f}ms, p99 {self.p99 * 1000:.1f}ms, '
+            f'errors {{{errors}}}'
+        )
+
+
+def run_load(call, locations, concurrency=8, iterations=1, clock=time.perf_counter):
+    """
+    Call a forecast source for every location from concurrent threads
+
+    :param callable call: called with lat and lon, returns a climacell.api.Response
+    :param list[tuple[float, float]] locations: lat and lon of the locations
+    :param int concurrency: number of concurrent callers
+    :param int iterations: number of calls per location
+    :param callable clock: returns the current time in seconds
+    :return: throughput, latency percentiles and errors of the calls
+    :rtype: LoadReport
+    """
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def measure(location):
+        start = clock()
+        try:
+            response = call(*location)
+            error = response.status_code if response.has_error else None
+        except Exception as e:
+            error = type(e).__name__
+        latency = clock() - start
+
+        with lock:
+            latencies.append(latency)
+            if error is not None:
+                errors[error] += 1
+
+    start = clock()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(iterations):
+            list(executor.map(measure, locations))
+
+    return LoadReport(latencies, errors, clock() - start)
+
+
+def grid(count):
+    """
+    :param int count: number of locations
+    :return: distinct lat and lon pairs
+    :rtype: list[tuple[float, float]]
+    """
+    return [(round(-60 + (i // 100) * 0.5, 2), round(-180 + (i % 100) * 0.5, 2)) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the client against a local stub API')
+    parser.add_argument('--recording', help='recorded exchanges to serve, defaults to synthetic hourly forecasts')
+    parser.add_argument('--fields', default='temp,wind_speed', help='comma separated hourly fields')
+    parser.add_argument('--locations', type=int, default=100, help='number of locations')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent callers')
+    parser.add_argument('--iterations', type=int, default=3, help='number of calls per location')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every response is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 500 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of 429 responses')
+    parser.add_argument('--cache', action='store_true', help='call through StaleWhileRevalidate')
+    args = parser.parse_args(argv)
+
+    fields = args.fields.split(',')
+    options = dict(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate
+    )
+
+    if args.recording:
+        stub = StubServer.from_recording(load_recording(args.recording), **options)
+    else:
+        stub = StubServer({HOURLY_PATH: (200, synthetic_forecast(fields))}, **options)
+
+    with stub:
+        source = Client('load-test', base_url=stub.base_url + API_PATH)
+        if args.cache:
+            source = StaleWhileRevalidate(source, workers=args.concurrency)
+
+        report = run_load(
+            lambda lat, lon: source.hourly(lat, lon, fields), grid(args.locations), args.concurrency, args.iterations
+        )
+
+        if args.cache:
+            source.close()
+
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
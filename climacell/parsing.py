@@ -0,0 +1,489 @@
+import math
+import sys
+import threading
+from array import array
+
+from climacell.fields import CATALOG, TYPE_CATEGORICAL, TYPE_NUMERIC
+
+SHAPE_SCALAR = 'scalar'
+SHAPE_UNITLESS = 'unitless'
+SHAPE_AGGREGATE = 'aggregate'
+
+OBSERVATION_TIME = 'observation_time'
+
+# Code of a missing categorical value
+MISSING = -1
+CODE_TYPE = 'h'
+# Number of distinct values a categorical field can have, the largest code fits CODE_TYPE
+MAX_CODES = 2 ** 15
+VALUE_TYPE = 'd'
+
+_plans = {}
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+
+def is_numeric(values):
+    """
+    :param list values:
+    :return: True if all values are numbers or None
+    :rtype: bool
+    """
+    if isinstance(values, array):
+        return values.typecode == VALUE_TYPE
+
+    return all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values)
+
+
+class Dictionary:
+    def __init__(self, limit=MAX_CODES):
+        """
+        Maps the values of a categorical field to small integer codes. Codes
+        are never reassigned, so they can be compared across responses. The
+        dictionary stops growing at its limit, series with values beyond it
+        are stored as lists.
+
+        :param int limit: maximum number of values
+        """
+        self.values = []
+        self.codes = {}
+        self.limit = limit
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        """
+        :param str value: categorical value or None
+        :return: the code of the value, MISSING for None
+        :rtype: int
+        :raises OverflowError: for a new value when the dictionary is full
+        """
+        code = self.codes.get(value)
+
+        if code is not None:
+            return code
+
+        if value is None:
+            return MISSING
+
+        with self._lock:
+            code = self.codes.get(value)
+            if code is None:
+                code = len(self.values)
+                if code >= self.limit:
+                    raise OverflowError(f'More than {self.limit} distinct values')
+                self.values.append(sys.intern(value))
+                self.codes[value] = code
+
+        return code
+
+    def decode(self, code):
+        """
+        :param int code:
+        :return: the value of the code, None for MISSING
+        :rtype: str
+        """
+        if code == MISSING:
+            return None
+
+        return self.values[code]
+
+    def decode_all(self, codes):
+        """
+        :param codes: a sequence of codes
+        :return: the values of the codes
+        :rtype: list[str]
+        """
+        values = self.values
+        return [None if code == MISSING else values[code] for code in codes]
+
+
+def get_dictionary(field):
+    """
+    :param str field: categorical data field
+    :return: the dictionary shared by all responses for the field
+    :rtype: Dictionary
+    """
+    dictionary = _dictionaries.get(field)
+
+    if dictionary is None:
+        with _dictionaries_lock:
+            dictionary = _dictionaries.setdefault(field, Dictionary())
+
+    return dictionary
+
+
+class Series:
+    __slots__ = ('name', 'field', 'aggregate', 'unit', 'values', 'times', 'dictionary', 'originals')
+
+    def __init__(self, name, field, aggregate, unit, values, times, dictionary=None):
+        """
+        A column of values for a single field, or a single aggregate of a daily field
+
+        :param str name: output name, e.g. temp or temp_min
+        :param str field: the requested data field
+        :param str aggregate: min, max, accumulation or None for regular fields
+        :param str unit: unit of the values or None
+        :param list values: one value per response item, a float array for numeric
+            fields (NaN if missing) and a code array for categorical fields
+        :param list[str] times: observation time of every value
+        :param Dictionary dictionary: the dictionary of the codes of a categorical field
+        """
+        self.name = name
+        self.field = field
+        self.aggregate = aggregate
+        self.unit = unit
+        self.values = values
+        self.times = times
+        self.dictionary = dictionary
+        # values of a float array that were not floats in the response, e.g. integers, by index
+        self.originals = None
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def is_categorical(self):
+        return self.dictionary is not None
+
+    def decoded(self):
+        """
+        :return: the values as they were in the response, decoded for categorical
+            fields and with None for missing numeric values
+        :rtype: list
+        """
+        if self.dictionary is not None:
+            return self.dictionary.decode_all(self.values)
+
+        if isinstance(self.values, array):
+            values = [None if value != value else value for value in self.values]
+            if self.originals:
+                for i, value in self.originals.items():
+                    values[i] = value
+            return values
+
+        return self.values
+
+
+class Columns:
+    def __init__(self, times, series):
+        """
+        Columnar representation of a response
+
+        :param list[str] times: observation time of every response item
+        :param list[Series] series: the parsed series, in extraction order
+        """
+        self.times = times
+        self.series = {s.name: s for s in series}
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+    def __contains__(self, name):
+        return name in self.series
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def names(self):
+        return list(self.series)
+
+    @property
+    def units(self):
+        return {name: s.unit for name, s in self.series.items()}
+
+    def measurements(self, measurement):
+        """
+        :param type measurement: the class to create measurements with
+        :return: measurements ordered by response item and field
+        :rtype: list[Measurement]
+        """
+        measurements = []
+        series = [(s, s.decoded()) for s in self.series.values()]
+
+        for i in range(len(self.times)):
+            for s, values in series:
+                time = s.times[i]
+                if time is not None:
+                    measurements.append(measurement(s.name, values[i], s.unit, time))
+
+        return measurements
+
+
+def _field_shape(entry):
+    """
+    Determine the shape of a field value in a response item
+
+    :param dict|list entry: the value of a field in a response item
+    :return: one of the SHAPE_ constants
+    :rtype: str
+    """
+    if isinstance(entry, list):
+        return SHAPE_AGGREGATE
+
+    if 'units' in entry:
+        return SHAPE_SCALAR
+
+    return SHAPE_UNITLESS
+
+
+def _aggregate_units(entry):
+    """
+    Collect the aggregates and their units from a daily field value, e.g.
+    [{'observation_time': ..., 'min': {'value': 1, 'units': 'C'}}, ...]
+
+    :param list[dict] entry: the value of a daily field in a response item
+    :return: a dict of aggregate name to unit
+    :rtype: dict
+    """
+    units = {}
+
+    for aggregate_entry in entry:
+        for key, payload in aggregate_entry.items():
+            if key != OBSERVATION_TIME:
+                units[key] = payload.get('units', None)
+
+    return units
+
+
+def _aggregate_name(field, aggregate):
+    """
+    :param str field: daily data field, e.g. temp
+    :param str aggregate: aggregate, e.g. min
+    :return: the output name, e.g. temp_min. Fields already ending with the
+        aggregate keep their name, e.g. precipitation_accumulation
+    :rtype: str
+    """
+    if field.endswith('_' + aggregate):
+        return field
+
+    return f'{field}_{aggregate}'
+
+
+def _allocate(dtype, size):
+    """
+    :param str dtype: one of the fields.TYPE_ constants or None for unknown fields
+    :param int size: number of values
+    :return: a float array of NaN for numeric fields, a list of None otherwise
+    """
+    if dtype == TYPE_NUMERIC:
+        return array(VALUE_TYPE, [math.nan]) * size
+
+    return [None] * size
+
+
+def _unit(entry):
+    """
+    :param dict entry: the value of a field in a response item
+    :return: the unit of the value or None
+    :rtype: str
+    """
+    return entry.get('units', None) if isinstance(entry, dict) else None
+
+
+def _fall_back(series):
+    """
+    Store the values of a series in a list, for responses with values that do
+    not match the catalog type, e.g. a string for a numeric field
+    """
+    series.values = list(series.decoded())
+    series.dictionary = None
+    series.originals = None
+
+
+def _store(series, i, value):
+    try:
+        series.values[i] = value
+    except TypeError:
+        _fall_back(series)
+        series.values[i] = value
+        return
+
+    if type(value) is not float and isinstance(series.values, array):
+        if series.originals is None:
+            series.originals = {}
+        series.originals[i] = value
+
+
+class _ScalarExtractor:
+    def __init__(self, field, dtype):
+        self.field = field
+        self.dtype = dtype
+
+    def allocate(self, size, times, sample):
+        """
+        :param int size: number of response items
+        :param list[str] times: the shared observation times of the items
+        :param dict sample: the first item of the response, providing the unit
+        :return: the allocated series and a function filling them per item
+        :rtype: tuple[list[Series], callable]
+        """
+        field = self.field
+        series = Series(field, field, None, _unit(sample.get(field)), _allocate(self.dtype, size), times)
+
+        def extract(i, item):
+            value = item[field]['value']
+            if value is not None:
+                _store(series, i, value)
+
+        return [series], extract
+
+
+class _CategoricalExtractor:
+    def __init__(self, field):
+        self.field = field
+        self.dictionary = get_dictionary(field)
+
+    def allocate(self, size, times, sample):
+        """
+        :param int size: number of response items
+        :param list[str] times: the shared observation times of the items
+        :param dict sample: the first item of the response, providing the unit
+        :return: the allocated series and a function filling them per item
+        :rtype: tuple[list[Series], callable]
+        """
+        field = self.field
+        encode = self.dictionary.encode
+        codes = array(CODE_TYPE, [MISSING]) * size
+        series = Series(field, field, None, _unit(sample.get(field)), codes, times, self.dictionary)
+
+        def extract(i, item):
+            value = item[field]['value']
+
+            if series.dictionary is None:
+                series.values[i] = value
+                return
+
+            try:
+                series.values[i] = encode(value)
+            except (TypeError, OverflowError):
+                _fall_back(series)
+                series.values[i] = value
+
+        return [series], extract
+
+
+class _AggregateExtractor:
+    def __init__(self, field, aggregates, dtype):
+        self.field = field
+        self.aggregates = aggregates
+        self.dtype = dtype
+        self.names = {aggregate: _aggregate_name(field, aggregate) for aggregate in aggregates}
+
+    def allocate(self, size, times, sample):
+        """
+        :param int size: number of response items
+        :param list[str] times: the shared observation times of the items, unused
+            because every aggregate has its own observation time
+        :param dict sample: the first item of the response, providing the units
+        :return: the allocated series and a function filling them per item
+        :rtype: tuple[list[Series], callable]
+        """
+        field = self.field
+        units = _aggregate_units(sample[field]) if isinstance(sample.get(field), list) else {}
+        slots = {}
+        series = []
+
+        for aggregate in self.aggregates:
+            unit = units.get(aggregate)
+            aggregate_times = [None] * size
+            s = Series(self.names[aggregate], field, aggregate, unit, _allocate(self.dtype, size), aggregate_times)
+            slots[aggregate] = (s, aggregate_times)
+            series.append(s)
+
+        def extract(i, item):
+            for aggregate_entry in item[field]:
+                for key, payload in aggregate_entry.items():
+                    slot = slots.get(key)
+                    if slot is not None:
+                        if payload['value'] is not None:
+                            _store(slot[0], i, payload['value'])
+                        slot[1][i] = aggregate_entry[OBSERVATION_TIME]
+
+        return series, extract
+
+
+class ExtractionPlan:
+    def __init__(self, fields, sample):
+        """
+        Decide once how every field is extracted. The value type and daily
+        aggregates come from the field catalog, the shape from a sample item
+        of a response, so that the plan follows the actual API response if it
+        differs from the catalog. Units are not part of the plan, they depend
+        on the requested unit system and are read from every response.
+
+        :param list[str] fields: requested data fields
+        :param dict sample: the first item of a response
+        """
+        self.fields = fields
+        self.shapes = {}
+        self.extractors = []
+
+        for field in fields:
+            entry = sample[field]
+            shape = _field_shape(entry)
+            self.shapes[field] = shape
+            spec = CATALOG.get(field)
+            dtype = spec.dtype if spec is not None else None
+
+            if shape == SHAPE_AGGREGATE:
+                aggregates = dict.fromkeys(spec.daily_aggregates if spec is not None else ())
+                aggregates.update(_aggregate_units(entry))
+                self.extractors.append(_AggregateExtractor(field, list(aggregates), dtype))
+            elif dtype == TYPE_CATEGORICAL:
+                self.extractors.append(_CategoricalExtractor(field))
+            else:
+                self.extractors.append(_ScalarExtractor(field, dtype))
+
+    def columns(self, items):
+        """
+        Parse the items of a response into preallocated columns. Aggregates of
+        daily fields are matched by key, aggregates missing from an item have
+        no observation time.
+
+        :param list[dict] items: the items of a response
+        :return: the parsed columns
+        :rtype: Columns
+        """
+        size = len(items)
+        times = [None] * size
+        series = []
+        extractors = []
+
+        for extractor in self.extractors:
+            allocated, extract = extractor.allocate(size, times, items[0] if items else {})
+            series.extend(allocated)
+            extractors.append(extract)
+
+        for i, item in enumerate(items):
+            times[i] = item[OBSERVATION_TIME]['value']
+            for extract in extractors:
+                extract(i, item)
+
+        return Columns(times, series)
+
+
+def get_plan(endpoint, fields, sample):
+    """
+    Returns the extraction plan for the endpoint and fields. Plans are cached
+    across responses, unless the endpoint is unknown.
+
+    :param str endpoint: endpoint the response was retrieved from or None
+    :param list[str] fields: requested data fields
+    :param dict sample: the first item of the response
+    :return: an extraction plan
+    :rtype: ExtractionPlan
+    """
+    if endpoint is None:
+        return ExtractionPlan(fields, sample)
+
+    key = (endpoint, tuple(fields))
+    plan = _plans.get(key)
+
+    if plan is None:
+        plan = _plans[key] = ExtractionPlan(fields, sample)
+
+    return plan
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+from climacell.instrumentation import DEFAULT_BUCKETS, Histogram
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10, cooldown=30, clock=time.monotonic):
+        """
+        Stops sending requests once too many of the recent requests failed. After
+        the cooldown a single probe request is let through, if it succeeds the
+        circuit closes again.
+
+        :param float failure_rate: fraction of failed requests in the window that opens the circuit
+        :param int window: number of recent requests to consider
+        :param int min_calls: minimum number of requests in the window before the circuit can open
+        :param float cooldown: seconds the circuit stays open
+        :param callable clock: returns the current time in seconds
+        """
+        if not 0 < failure_rate <= 1:
+            raise ValueError('failure rate should be between 0 and 1')
+
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = STATE_CLOSED
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: whether a request may be sent
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == STATE_OPEN and self.clock() - self._opened_at >= self.cooldown:
+                self.state = STATE_HALF_OPEN
+                self._probing = False
+
+            if self.state == STATE_CLOSED:
+                return True
+
+            if self.state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record(self, success):
+        """
+        Record the outcome of an allowed request
+
+        :param bool success: whether the request succeeded
+        :return: whether the outcome opened the circuit
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                if success:
+                    self.state = STATE_CLOSED
+                    self._outcomes.clear()
+                    return False
+                return self._open()
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                return self._open()
+
+            return False
+
+    def _open(self):
+        self.state = STATE_OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.trips += 1
+        return True
+
+
+class Hedging:
+    def __init__(self, quantile=0.95, min_samples=20, initial_delay=None, buckets=DEFAULT_BUCKETS):
+        """
+        Decides when a duplicate request is sent: once a request takes longer than
+        the given latency quantile of earlier requests to the same endpoint
+
+        :param float quantile: latency quantile used as hedge delay
+        :param int min_samples: number of requests per endpoint before the quantile is used
+        :param float initial_delay: hedge delay until enough requests were observed, None to not hedge
+        :param tuple[float] buckets: latency histogram bucket upper bounds
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, seconds):
+        with self._lock:
+            if endpoint not in self.histograms:
+                self.histograms[endpoint] = Histogram(self.buckets)
+
+            self.histograms[endpoint].observe(seconds)
+
+    def delay(self, endpoint):
+        """
+        :param str endpoint: endpoint of the request
+        :return: seconds to wait before sending a duplicate request, None to not hedge
+        :rtype: float
+        """
+        with self._lock:
+            histogram = self.histograms.get(endpoint)
+
+            if histogram is None or histogram.count < self.min_samples:
+                return self.initial_delay
+
+            delay = histogram.quantile(self.quantile)
+
+        return None if delay == float('inf') else delay
@@ -0,0 +1,163 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class Entry:
+    def __init__(self, response, fetched_at):
+        """
+        :param climacell.api.Response response: the last good response
+        :param float fetched_at: clock time the response was retrieved
+        """
+        self.response = response
+        self.fetched_at = fetched_at
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(value)
+
+    return value
+
+
+def _key(method, args, kwargs):
+    """
+    :return: a cache key for a client call
+    :rtype: tuple
+    """
+    return (
+        method,
+        tuple(_hashable(arg) for arg in args),
+        tuple(sorted((name, _hashable(value)) for name, value in kwargs.items())),
+    )
+
+
+class StaleWhileRevalidate:
+    def __init__(self, client, soft_ttl=300, hard_ttl=3600, workers=4, clock=time.monotonic):
+        """
+        Serves forecasts from a Client. Once the soft TTL of a response passed,
+        the last good response is returned immediately and a single background
+        refresh is started. Responses older than the hard TTL are refreshed
+        synchronously. Error responses and exceptions never replace a good response.
+
+        :param climacell.api.Client client: client to retrieve forecasts with
+        :param float soft_ttl: seconds after which a response is refreshed in the background
+        :param float hard_ttl: seconds after which a response is no longer served
+        :param int workers: number of background refresh workers
+        :param callable clock: returns the current time in seconds
+        """
+        if hard_ttl < soft_ttl:
+            raise ValueError('hard ttl cannot be smaller than soft ttl')
+
+        self.client = client
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.clock = clock
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='climacell-refresh')
+
+    def get(self, method, *args, **kwargs):
+        """
+        Get a response for a client call, e.g. get('hourly', lat, lon, fields)
+
+        :param str method: hourly, nowcast or daily
+        :return: the response
+        :rtype: climacell.api.Response
+        """
+        key = _key(method, args, kwargs)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            age = self.clock() - entry.fetched_at
+            if age < self.soft_ttl:
+                return entry.response
+            if age < self.hard_ttl:
+                self._fetch(key, method, args, kwargs, background=True)
+                return entry.response
+
+        return self._fetch(key, method, args, kwargs, background=False).result()
+
+    def hourly(self, *args, **kwargs):
+        return self.get('hourly', *args, **kwargs)
+
+    def nowcast(self, *args, **kwargs):
+        return self.get('nowcast', *args, **kwargs)
+
+    def daily(self, *args, **kwargs):
+        return self.get('daily', *args, **kwargs)
+
+    def age(self, method, *args, **kwargs):
+        """
+        :param str method: hourly, nowcast or daily
+        :return: age in seconds of the response served for the call or None if there is none
+        :rtype: float
+        """
+        entry = self._entries.get(_key(method, args, kwargs))
+
+        if entry is None:
+            return None
+
+        return self.clock() - entry.fetched_at
+
+    def ages(self):
+        """
+        :return: the age in seconds of every cached response by cache key
+        :rtype: dict
+        """
+        now = self.clock()
+        return {key: now - entry.fetched_at for key, entry in list(self._entries.items())}
+
+    def _fetch(self, key, method, args, kwargs, background):
+        """
+        Refresh the response for a key, concurrent refreshes of the same key are coalesced
+
+        :return: a future of the new response
+        :rtype: Future
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+
+            future = self._inflight[key] = Future()
+
+        if background:
+            self._executor.submit(self._refresh, key, future, method, args, kwargs)
+        else:
+            self._refresh(key, future, method, args, kwargs)
+
+        return future
+
+    def _refresh(self, key, future, method, args, kwargs):
+        try:
+            response = getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            self._done(key)
+            future.set_exception(e)
+            return
+
+        if not response.has_error:
+            self._entries[key] = Entry(response, self.clock())
+
+        self._done(key)
+        future.set_result(response)
+
+    def _done(self, key):
+        with self._lock:
+            del self._inflight[key]
+
+    def wait(self, timeout=None):
+        """
+        Wait for the running refreshes to finish
+
+        :param float timeout: seconds to wait at most
+        """
+        with self._lock:
+            futures = list(self._inflight.values())
+
+        wait(futures, timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,275 @@
+import math
+from array import array
+from datetime import datetime, timezone
+
+from climacell.aggregation import AGGREGATE_CIRCULAR_MEAN, AGGREGATE_SUM, rule_for
+from climacell.api import Error
+from climacell.fields import CATALOG, ENDPOINT_DAILY, ENDPOINT_HOURLY, ENDPOINT_NOWCAST, TYPE_CATEGORICAL
+from climacell.parsing import CODE_TYPE, MISSING, VALUE_TYPE, Columns, Series
+from climacell.utils import parse_timestamp
+
+INTERPOLATE_LINEAR = 'linear'
+INTERPOLATE_NEAREST = 'nearest'
+INTERPOLATE_CIRCULAR = 'circular'
+
+# Daily aggregates that are actual values of the field at their observation time
+POINT_AGGREGATES = ('min', 'max')
+
+
+def time_grid(start, end, step):
+    """
+    :param float start: first timestamp in seconds since the epoch
+    :param float end: last timestamp, included if it is on the grid
+    :param float step: seconds between the timestamps
+    :return: the timestamps of the grid
+    :rtype: list[float]
+    """
+    if step <= 0:
+        raise ValueError('Step should be positive')
+
+    return [start + i * step for i in range(int((end - start) // step) + 1)]
+
+
+def format_timestamp(timestamp):
+    """
+    :param float timestamp: seconds since the epoch
+    :return: the timestamp in the ISO 8601 format of the API
+    :rtype: str
+    """
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _is_missing(value, categorical):
+    return value == MISSING if categorical else value is None or value != value
+
+
+def _points(series, cache):
+    """
+    :return: the timestamps and values of the non-missing values of a series,
+        categorical values are codes
+    :rtype: list[tuple[float, object]]
+    """
+    key = id(series.times)
+    if key not in cache:
+        cache[key] = [None if time is None else parse_timestamp(time) for time in series.times]
+
+    categorical = series.is_categorical
+    return [
+        (timestamp, value) for timestamp, value in zip(cache[key], series.values)
+        if timestamp is not None and not _is_missing(value, categorical)
+    ]
+
+
+def _source_series(columns, name):
+    """
+    :return: the series of a source for a name. A field without its own series
+        on the daily endpoint is made up of its min and max aggregates, which
+        are values of the field at their own observation times.
+    :rtype: list[Series]
+    """
+    if name in columns:
+        return [columns[name]]
+
+    return [
+        s for s in columns.series.values()
+        if s.field == name and s.aggregate in POINT_AGGREGATES
+    ]
+
+
+def merge(sources, name):
+    """
+    Merge the series of a name from several sources, sources are ordered from
+    the finest to the coarsest resolution. Points of a coarser source are only
+    used outside the time range covered by the finer sources. Accumulations,
+    e.g. precipitation_accumulation, are totals over the resolution of their
+    source and are only taken from the finest source providing them.
+
+    :param list[Columns] sources: parsed responses, e.g. nowcast, hourly and daily
+    :param str name: series name, e.g. temp
+    :return: sorted timestamps, values and the first series of the name
+    :rtype: tuple[list[float], list, Series]
+    """
+    cache = {}
+    merged = []
+    first = None
+
+    for columns in sources:
+        series = _source_series(columns, name)
+        if not series:
+            continue
+
+        if first is None:
+            first = series[0]
+        points = sorted(dict(point for s in series for point in _points(s, cache)).items())
+
+        if merged:
+            points = [p for p in points if p[0] < merged[0][0]] + merged + [p for p in points if p[0] > merged[-1][0]]
+
+        merged = points
+
+        if rule_for(name, first.field) == AGGREGATE_SUM:
+            break
+
+    return [point[0] for point in merged], [point[1] for point in merged], first
+
+
+def interpolate(timestamps, values, grid, how=INTERPOLATE_LINEAR, result=None):
+    """
+    Resample sorted points onto a sorted grid in a single pass. Grid timestamps
+    outside the points keep the missing value of the result.
+
+    :param list[float] timestamps: sorted timestamps of the points
+    :param list values: values of the points
+    :param list[float] grid: sorted timestamps to resample to
+    :param str how: INTERPOLATE_LINEAR for numeric values, INTERPOLATE_CIRCULAR
+        for angles in degrees along the shortest arc, INTERPOLATE_NEAREST for
+        other values, e.g. categorical codes
+    :param result: preallocated values of the grid, defaults to a float array of NaN
+    :return: the values at the grid timestamps
+    :rtype: array
+    """
+    if result is None:
+        result = array(VALUE_TYPE, [math.nan]) * len(grid)
+
+    nearest = how == INTERPOLATE_NEAREST
+    size = len(timestamps)
+    j = 0
+
+    for i, timestamp in enumerate(grid):
+        while j < size and timestamps[j] < timestamp:
+            j += 1
+
+        if j < size and timestamps[j] == timestamp:
+            result[i] = values[j]
+        elif 0 < j < size:
+            t0, t1 = timestamps[j - 1], timestamps[j]
+            if nearest:
+                result[i] = values[j - 1] if timestamp - t0 <= t1 - timestamp else values[j]
+            else:
+                result[i] = _between(values[j - 1], values[j], (timestamp - t0) / (t1 - t0), how)
+
+    return result
+
+
+def _between(start, end, fraction, how):
+    """
+    :return: the value at a fraction of the way from start to end, angles
+        turn along the shortest arc, e.g. from 350 through 0 to 10 degrees
+    :rtype: float
+    """
+    if how == INTERPOLATE_CIRCULAR:
+        return (start + ((end - start + 180) % 360 - 180) * fraction) % 360
+
+    return start + (end - start) * fraction
+
+
+def _resample(series, timestamps, values, grid):
+    """
+    :return: numeric series interpolated linearly into a float array, angles
+        aggregated with a circular mean along the shortest arc, categorical
+        codes and other values, e.g. sunrise times, from the nearest point
+    """
+    spec = CATALOG.get(series.field)
+
+    if series.is_categorical or (spec is not None and spec.dtype == TYPE_CATEGORICAL):
+        return interpolate(timestamps, values, grid, INTERPOLATE_NEAREST, array(CODE_TYPE, [MISSING]) * len(grid))
+
+    if isinstance(series.values, array):
+        circular = rule_for(series.name, series.field) == AGGREGATE_CIRCULAR_MEAN
+        return interpolate(timestamps, values, grid, INTERPOLATE_CIRCULAR if circular else INTERPOLATE_LINEAR)
+
+    return interpolate(timestamps, values, grid, INTERPOLATE_NEAREST, [None] * len(grid))
+
+
+class Timeline(Columns):
+    def __init__(self, timestamps, series):
+        """
+        Columns on a regular time grid
+
+        :param list[float] timestamps: the grid in seconds since the epoch
+        :param list[Series] series: a series per field
+        """
+        super().__init__([format_timestamp(timestamp) for timestamp in timestamps], series)
+        self.timestamps = timestamps
+
+
+def _names(sources):
+    names = []
+
+    for columns in sources:
+        for s in columns.series.values():
+            name = s.field if s.aggregate in POINT_AGGREGATES and s.field not in columns else s.name
+            if name not in names:
+                names.append(name)
+
+    return names
+
+
+def stitch(sources, grid, names=None):
+    """
+    Merge responses of different resolutions into one series per field on a
+    time grid, preferring the finest resolution available at every time
+
+    :param list[Columns] sources: parsed responses ordered from the finest to the
+        coarsest resolution, e.g. nowcast, hourly and daily
+    :param list[float] grid: sorted timestamps in seconds since the epoch
+    :param list[str] names: series to stitch, defaults to all fields of the sources
+    :return: the stitched series
+    :rtype: Timeline
+    """
+    result = []
+
+    for name in names or _names(sources):
+        timestamps, values, first = merge(sources, name)
+        if first is None:
+            continue
+
+        resampled = _resample(first, timestamps, values, grid)
+        aggregate = first.aggregate if first.name == name else None
+        result.append(Series(name, first.field, aggregate, first.unit, resampled, None, first.dictionary))
+
+    timeline = Timeline(grid, result)
+
+    for s in result:
+        s.times = timeline.times
+
+    return timeline
+
+
+def _available(fields, endpoint):
+    return [field for field in fields if field not in CATALOG or endpoint in CATALOG[field].endpoints]
+
+
+def fetch_timeline(source, lat, lon, fields, grid, timestep=1):
+    """
+    Retrieve the nowcast, hourly and daily forecasts of a location and stitch
+    them into a timeline. Endpoints answering with an error are left out.
+
+    :param source: object with nowcast, hourly and daily methods like Client
+        or StaleWhileRevalidate
+    :param float lat: location latitude
+    :param float lon: location longitude
+    :param list[str] fields: requested data fields, each endpoint is requested
+        with the fields it provides
+    :param list[float] grid: sorted timestamps in seconds since the epoch
+    :param int timestep: nowcast timestep in minutes
+    :return: the stitched series
+    :rtype: Timeline
+    """
+    sources = []
+    requests = [
+        (ENDPOINT_NOWCAST, lambda available: source.nowcast(lat, lon, available, timestep)),
+        (ENDPOINT_HOURLY, lambda available: source.hourly(lat, lon, available)),
+        (ENDPOINT_DAILY, lambda available: source.daily(lat, lon, available)),
+    ]
+
+    for endpoint, request in requests:
+        available = _available(fields, endpoint)
+        if not available:
+            continue
+
+        columns = request(available).get_columns()
+        if not isinstance(columns, Error):
+            sources.append(columns)
+
+    return stitch(sources, grid, fields)
@@ -0,0 +1,182 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qsl
+
+from climacell.fields import CATALOG, TYPE_NUMERIC
+
+UNAUTHORIZED = {'statusCode': 401, 'errorCode': 'Unauthorized', 'message': 'Invalid API key'}
+RATE_LIMITED = {'statusCode': 429, 'errorCode': 'TooManyRequests', 'message': 'Rate limit exceeded'}
+SERVER_ERROR = {'statusCode': 500, 'errorCode': 'InternalError', 'message': 'Injected error'}
+
+
+def synthetic_forecast(fields, points=108, step=3600, start=None, seed=None):
+    """
+    Generate a nowcast or hourly payload with random values for numeric fields,
+    other fields are missing
+
+    :param list[str] fields: fields of the items
+    :param int points: number of items
+    :param float step: seconds between the items
+    :param datetime start: time of the first item, defaults to the current hour
+    :param int seed: seed of the random values
+    :return: the payload
+    :rtype: list[dict]
+    """
+    generator = random.Random(seed)
+    start = start or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    items = []
+
+    for i in range(points):
+        item = {
+            'lat': 0.0,
+            'lon': 0.0,
+            'observation_time': {'value': (start + timedelta(seconds=i * step)).strftime('%Y-%m-%dT%H:%M:%S.000Z')},
+        }
+
+        for field in fields:
+            numeric = field in CATALOG and CATALOG[field].dtype == TYPE_NUMERIC
+            item[field] = {'value': round(generator.uniform(0, 30), 2) if numeric else None}
+
+        items.append(item)
+
+    return items
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    stub = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.stub.requests.append((url.path, dict(parse_qsl(url.query)), dict(self.headers)))
+        status, data, headers = self.stub.respond(url.path, self.headers.get('apikey'))
+
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up waiting, e.g. after a timeout
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, payloads, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, seed=None, quotas=None):
+        """
+        A local HTTP server answering API requests with canned payloads, optionally
+        injecting latency, server errors and rate limiting
+
+        :param dict payloads: (status code, JSON data) per endpoint, e.g. '/weather/forecast/hourly'
+        :param str host: host to bind to
+        :param int port: port to bind to, 0 picks a free port
+        :param float latency: seconds every response is delayed, or a callable returning the delay of a response
+        :param float jitter: maximum random seconds added to the latency
+        :param float error_rate: fraction of requests answered with a 500 error
+        :param float rate_limit_rate: fraction of requests answered with a 429 error
+        :param int seed: seed of the random injections
+        :param dict[str, int] quotas: remaining requests per API key, other keys are unauthorized.
+            Without quotas every key is accepted.
+        """
+        self.payloads = payloads
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quotas = quotas
+        self.requests = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        handler = type('Handler', (StubHandler,), {'stub': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self._thread = None
+
+    @classmethod
+    def from_recording(cls, exchanges, **kwargs):
+        """
+        Serve recorded exchanges, the last exchange per path is served
+
+        :param list[dict] exchanges: exchanges, see climacell.transport.load_recording
+        :rtype: StubServer
+        """
+        payloads = {exchange['path']: (exchange['status'], json.loads(exchange['body'])) for exchange in exchanges}
+        return cls(payloads, **kwargs)
+
+    def _charge(self, api_key):
+        """
+        :return: the remaining quota of the key after the request, -1 for unknown keys
+            and None without quotas
+        :rtype: int
+        """
+        if self.quotas is None:
+            return None
+
+        with self._lock:
+            if api_key not in self.quotas:
+                return -1
+
+            self.quotas[api_key] = max(self.quotas[api_key] - 1, -1)
+            return self.quotas[api_key]
+
+    def respond(self, path, api_key=None):
+        """
+        :param str path: requested path
+        :param str api_key: API key of the request
+        :return: status code, JSON data and headers of the response, after the injected latency
+        :rtype: tuple[int, object, dict]
+        """
+        with self._lock:
+            latency = self.latency() if callable(self.latency) else self.latency
+            delay = latency + self._random.uniform(0, self.jitter)
+            draw = self._random.random()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        remaining = self._charge(api_key)
+        headers = {} if remaining is None else {'X-RateLimit-Remaining': str(max(remaining, 0))}
+
+        if remaining is not None and api_key not in self.quotas:
+            return 401, UNAUTHORIZED, {}
+        if draw < self.rate_limit_rate or (remaining is not None and remaining < 0):
+            return 429, RATE_LIMITED, dict(headers, **{'Retry-After': '1'})
+        if draw < self.rate_limit_rate + self.error_rate:
+            return 500, SERVER_ERROR, headers
+        if path not in self.payloads:
+            return 404, {'statusCode': 404, 'errorCode': 'NotFound', 'message': 'Not found'}, headers
+
+        status, data = self.payloads[path]
+        return status, data, headers
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,84 @@
+import math
+from unittest import TestCase
+
+from climacell.aggregation import (
+    AGGREGATE_CIRCULAR_MEAN, AGGREGATE_MAX, AGGREGATE_MEAN, AGGREGATE_MIN, AGGREGATE_SUM,
+    circular_mean, downsample, lttb, rolling, rule_for, tumbling,
+)
+from climacell.fields import FIELD_PRECIPITATION_ACCUMULATION, FIELD_TEMP, FIELD_WIND_DIRECTION
+
+
+class TestAggregation(TestCase):
+    def test_rule_for(self):
+        self.assertEqual(AGGREGATE_SUM, rule_for(FIELD_PRECIPITATION_ACCUMULATION))
+        self.assertEqual(AGGREGATE_CIRCULAR_MEAN, rule_for(FIELD_WIND_DIRECTION))
+        self.assertEqual(AGGREGATE_MEAN, rule_for(FIELD_TEMP))
+        self.assertEqual(AGGREGATE_MIN, rule_for('temp_min', FIELD_TEMP))
+        self.assertEqual(AGGREGATE_MAX, rule_for('temp_max', FIELD_TEMP))
+
+    def test_circular_mean(self):
+        self.assertAlmostEqual(0, math.sin(math.radians(circular_mean([350, 10]))))
+        self.assertGreater(math.cos(math.radians(circular_mean([350, 10]))), 0.99)
+        self.assertAlmostEqual(90, circular_mean([45, 135]))
+
+        for degrees in ([350, 10], [359.9999999, 0.0000001], [270, 90, 0]):
+            self.assertTrue(0 <= circular_mean(degrees) < 360)
+        self.assertTrue(all(0 <= value < 360 for value in rolling([0, 1], [350, 10], 10, AGGREGATE_CIRCULAR_MEAN)[1]))
+
+    def test_tumbling(self):
+        timestamps = [0, 30, 60, 90, 150, 200]
+        values = [1, 2, 3, None, 5, math.nan]
+
+        self.assertEqual(([0, 60, 120], [1.5, 3, 5]), tumbling(timestamps, values, 60))
+        self.assertEqual(([0, 60, 120], [3, 3, 5]), tumbling(timestamps, values, 60, AGGREGATE_SUM))
+        self.assertEqual(([0, 60, 120], [2, 3, 5]), tumbling(timestamps, values, 60, AGGREGATE_MAX))
+        self.assertEqual(([], []), tumbling([], [], 60))
+
+    def test_rolling(self):
+        timestamps = [0, 10, 20, 30, 40]
+        values = [5, 1, 4, 2, 3]
+
+        self.assertEqual(values, rolling(timestamps, values, 10, AGGREGATE_MEAN)[1])
+        self.assertEqual([5, 1, 1, 1, 2], rolling(timestamps, values, 30, AGGREGATE_MIN)[1])
+        self.assertEqual([5, 5, 5, 4, 4], rolling(timestamps, values, 30, AGGREGATE_MAX)[1])
+        self.assertEqual([5, 6, 10, 7, 9], rolling(timestamps, values, 30, AGGREGATE_SUM)[1])
+        self.assertEqual([5, 3, 2.5, 3, 2.5], rolling(timestamps, values, 20, AGGREGATE_MEAN)[1])
+
+        directions = rolling([0, 10], [350, 10], 20, AGGREGATE_CIRCULAR_MEAN)[1]
+        self.assertAlmostEqual(0, math.sin(math.radians(directions[1])))
+
+    def test_lttb(self):
+        timestamps = list(range(100))
+        values = [0] * 100
+        values[42] = 10
+
+        sampled_timestamps, sampled_values = lttb(timestamps, values, 10)
+        self.assertEqual(10, len(sampled_timestamps))
+        self.assertEqual(0, sampled_timestamps[0])
+        self.assertEqual(99, sampled_timestamps[-1])
+        # the peak is kept
+        self.assertIn(42, sampled_timestamps)
+        self.assertIn(10, sampled_values)
+
+        self.assertEqual(([0, 99], [0, 0]), lttb(timestamps, values, 2))
+        self.assertEqual((timestamps, values), lttb(timestamps, values, 200))
+
+    def test_downsample(self):
+        timestamps = list(range(0, 3600 * 24, 3600))
+        precipitation = [1.0] * 24
+
+        sampled = downsample(FIELD_PRECIPITATION_ACCUMULATION, timestamps, precipitation, 4)
+        self.assertLessEqual(len(sampled[0]), 4)
+        self.assertEqual(24, sum(sampled[1]))
+
+        sampled = downsample(FIELD_TEMP, timestamps, list(range(24)), 4)
+        self.assertEqual(4, len(sampled[0]))
+
+        self.assertEqual((timestamps, precipitation), downsample(FIELD_TEMP, timestamps, precipitation, 0))
+
+    def test_downsample_single_point(self):
+        timestamps = [0, 3600, 7200]
+
+        self.assertEqual(([0], [6]), downsample(FIELD_PRECIPITATION_ACCUMULATION, timestamps, [1, 2, 3], 1))
+        self.assertEqual(([0], [3]), downsample('wind_gust', timestamps, [1, 3, 2], 1))
+        self.assertEqual(1, len(downsample(FIELD_TEMP, timestamps, [1, 2, 3], 1)[0]))
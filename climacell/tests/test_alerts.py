@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from climacell.alerts import (
+    FOG_PROBABILITY, STATE_FIRING, STATE_RESOLVED, AlertEngine, AlertTransition, Rule, fog_probability,
+)
+from climacell.delta import diff
+from climacell.parsing import get_plan
+from climacell.utils import parse_timestamp
+
+FIELDS = ['temp', 'dewpoint', 'cloud_cover', 'wind_speed', 'wind_gust', 'road_risk']
+
+
+def item(hour, wind_gust, road_risk='low_risk', temp=10.0, dewpoint=2.0):
+    return {
+        'observation_time': {'value': f'2021-01-14T{hour:02d}:00:00.000Z'},
+        'temp': {'value': temp, 'units': 'C'},
+        'dewpoint': {'value': dewpoint, 'units': 'C'},
+        'cloud_cover': {'value': 0, 'units': '%'},
+        'wind_speed': {'value': 1.0, 'units': 'm/s'},
+        'wind_gust': {'value': wind_gust, 'units': 'm/s'},
+        'road_risk': {'value': road_risk},
+    }
+
+
+def columns(items):
+    return get_plan(None, FIELDS, items[0]).columns(items)
+
+
+def at(hour):
+    return parse_timestamp(f'2021-01-14T{hour:02d}:00:00.000Z')
+
+
+class TestRule(TestCase):
+    def test_invalid_operator(self):
+        with self.assertRaises(ValueError):
+            Rule('gusts', 'wind_gust', '=>', 20)
+
+    def test_missing_value_does_not_match(self):
+        rule = Rule('gusts', 'wind_gust', '>', 20)
+
+        self.assertTrue(rule.test(21))
+        self.assertFalse(rule.test(None))
+
+    def test_fog_probability(self):
+        self.assertEqual(5, fog_probability(0.0, 2.0, 0, 1.0))
+        self.assertEqual(1, fog_probability(10.0, 2.0, 0, 1.0))
+
+
+class TestAlertEngine(TestCase):
+    def setUp(self):
+        self.engine = AlertEngine([
+            Rule('gusts', 'wind_gust', '>', 20, duration=3600),
+            Rule('road', 'road_risk', '==', 'high_risk'),
+            Rule('fog', 'fog_probability', '>=', 4),
+        ], derived=[FOG_PROBABILITY])
+
+    def test_duration(self):
+        transitions = self.engine.update('amsterdam', columns([item(14, 25), item(15, 10), item(16, 25)]))
+        self.assertEqual([], transitions)
+
+        transitions = self.engine.update('amsterdam', columns([item(14, 25), item(15, 22), item(16, 25)]))
+        self.assertEqual([AlertTransition('amsterdam', 'gusts', STATE_FIRING, at(14))], transitions)
+        self.assertEqual(['gusts'], self.engine.firing('amsterdam'))
+
+    def test_deduplicated(self):
+        first = self.engine.update('amsterdam', columns([item(14, 25, 'high_risk'), item(15, 25)]))
+        second = self.engine.update('amsterdam', columns([item(14, 25, 'high_risk'), item(15, 30)]))
+
+        self.assertEqual(
+            [AlertTransition('amsterdam', 'gusts', STATE_FIRING, at(14)),
+             AlertTransition('amsterdam', 'road', STATE_FIRING, at(14))],
+            sorted(first, key=lambda transition: transition.rule)
+        )
+        self.assertEqual([], second)
+
+    def test_resolved_when_points_leave_the_forecast(self):
+        self.engine.update('amsterdam', columns([item(14, 25, 'high_risk'), item(15, 5)]))
+        transitions = self.engine.update('amsterdam', columns([item(15, 5), item(16, 5)]))
+
+        self.assertEqual([AlertTransition('amsterdam', 'road', STATE_RESOLVED, None)], transitions)
+        self.assertEqual([], self.engine.firing('amsterdam'))
+
+    def test_split_run(self):
+        self.engine.update('amsterdam', columns([item(14, 25), item(15, 25), item(16, 25)]))
+        transitions = self.engine.update('amsterdam', columns([item(14, 25), item(15, 5), item(16, 25)]))
+
+        self.assertEqual([AlertTransition('amsterdam', 'gusts', STATE_RESOLVED, None)], transitions)
+
+    def test_locations_are_independent(self):
+        self.engine.update('amsterdam', columns([item(14, 5, 'high_risk')]))
+
+        self.assertEqual(['road'], self.engine.firing('amsterdam'))
+        self.assertEqual([], self.engine.firing('utrecht'))
+        self.assertEqual([], self.engine.update('utrecht', columns([item(14, 5)])))
+
+    def test_derived_field(self):
+        transitions = self.engine.update('amsterdam', columns([item(14, 5, temp=0.0, dewpoint=2.0)]))
+        self.assertEqual([AlertTransition('amsterdam', 'fog', STATE_FIRING, at(14))], transitions)
+
+        transitions = self.engine.update('amsterdam', columns([item(14, 5, temp=8.0, dewpoint=2.0)]))
+        self.assertEqual([AlertTransition('amsterdam', 'fog', STATE_RESOLVED, None)], transitions)
+
+    def test_apply_delta(self):
+        previous = columns([item(14, 5), item(15, 5)])
+        current = columns([item(15, 25), item(16, 25, 'high_risk')])
+        self.engine.apply_delta('amsterdam', diff(None, previous))
+
+        transitions = self.engine.apply_delta('amsterdam', diff(previous, current))
+
+        self.assertEqual(
+            [AlertTransition('amsterdam', 'gusts', STATE_FIRING, at(15)),
+             AlertTransition('amsterdam', 'road', STATE_FIRING, at(16))],
+            sorted(transitions, key=lambda transition: transition.rule)
+        )
+        self.assertEqual([], self.engine.update('amsterdam', current))
@@ -2,7 +2,7 @@ import json
 import os
 
 from unittest import TestCase, mock
-from climacell.api import Client, Measurement, Response, Error
+from climacell.api import DEFAULT_TIMEOUT, Client, Measurement, Response, Error
 from climacell.fields import (
     FIELD_TEMP, FIELD_DEW_POINT, FIELD_HUMIDITY,
     FIELD_WIND_SPEED, FIELD_WIND_GUST, FIELD_WIND_DIRECTION,
@@ -17,6 +17,24 @@ DAILY_FILE = os.path.dirname(__file__) + '/data/daily_example.json'
 NOWCAST_FILE = os.path.dirname(__file__) + '/data/nowcast_example.json'
 
 
+def load(file):
+    with open(file) as f:
+        return json.load(f)
+
+
+class FakeClock:
+    def __init__(self, step=0.0):
+        """
+        :param float step: seconds the clock advances every time it is read
+        """
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
 class MockResponse:
     def __init__(self, data, status_code):
         self.data = data
@@ -107,7 +125,8 @@ class TestClient(TestCase):
         mock_get.assert_called_with(
             'https://api.climacell.co/v3/weather/forecast/hourly',
             params=expected_params,
-            headers={'apikey': 'apikey'}
+            headers={'apikey': 'apikey'},
+            timeout=DEFAULT_TIMEOUT,
         )
 
         self.assertEqual(6, len(measurements))
@@ -135,6 +154,17 @@ class TestClient(TestCase):
             ValueError, client.hourly, lat, lon, fields, start_time, end_time
         )
 
+    @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
+    def test_invalid_fields(self, mock_get):
+        client = Client('apikey')
+        lat = 52.446023244274045
+        lon = 4.819207798979252
+
+        self.assertRaises(ValueError, client.hourly, lat, lon, ['temperature'])
+        self.assertRaises(ValueError, client.daily, lat, lon, ['road_risk'])
+        self.assertRaises(ValueError, client.nowcast, lat, lon, ['precipitation_probability'], 30)
+        mock_get.assert_not_called()
+
     @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
     def test_hourly_valid_end_time(self, mock_get):
         client = Client('apikey')
@@ -159,7 +189,8 @@ class TestClient(TestCase):
         mock_get.assert_called_with(
             'https://api.climacell.co/v3/weather/forecast/hourly',
             params=expected_params,
-            headers={'apikey': 'apikey'}
+            headers={'apikey': 'apikey'},
+            timeout=DEFAULT_TIMEOUT,
         )
 
     @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
@@ -194,7 +225,8 @@ class TestClient(TestCase):
         mock_get.assert_called_with(
             'https://api.climacell.co/v3/weather/nowcast',
             params=expected_params,
-            headers={'apikey': 'apikey'}
+            headers={'apikey': 'apikey'},
+            timeout=DEFAULT_TIMEOUT,
         )
         # 13 timesteps, 8 measurements per timestep
         self.assertEqual(13 * 8, len(measurements))
@@ -229,7 +261,8 @@ class TestClient(TestCase):
         mock_get.assert_called_with(
             'https://api.climacell.co/v3/weather/nowcast',
             params=expected_params,
-            headers={'apikey': 'apikey'}
+            headers={'apikey': 'apikey'},
+            timeout=DEFAULT_TIMEOUT,
         )
 
     def test_nowcast_invalid_start_time(self):
@@ -279,7 +312,8 @@ class TestClient(TestCase):
         mock_get.assert_called_with(
             'https://api.climacell.co/v3/weather/forecast/daily',
             params=expected_params,
-            headers={'apikey': 'apikey'}
+            headers={'apikey': 'apikey'},
+            timeout=DEFAULT_TIMEOUT,
         )
 
         self.assertEqual(6, len(measurements))
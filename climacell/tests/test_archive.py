@@ -0,0 +1,89 @@
+import json
+import math
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from climacell.api import Response
+from climacell.archive import Archive, write_archive
+from climacell.parsing import MISSING
+from climacell.tests.test_api import DAILY_FILE, HOURLY_FILE, NOWCAST_FILE, MockResponse
+from climacell.tests.test_parsing import CATEGORICAL_ITEMS
+
+
+def load_columns(file, fields):
+    with open(file) as f:
+        return Response(MockResponse(json.load(f), 200), fields).get_columns()
+
+
+class TestArchive(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.ccar')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip(self):
+        columns = load_columns(HOURLY_FILE, ['temp', 'humidity', 'dewpoint'])
+        write_archive(self.path, [columns])
+
+        with Archive(self.path) as archive:
+            self.assertEqual(2, len(archive))
+            self.assertEqual(['temp', 'humidity', 'dewpoint'], archive.names)
+            self.assertEqual({'temp': 'C', 'humidity': '%', 'dewpoint': 'C'}, archive.units)
+            self.assertEqual([1610632800, 1610636400], archive.timestamps.tolist())
+            self.assertAlmostEqual(2.56, archive['temp'][0], places=5)
+            self.assertAlmostEqual(76.09, archive['humidity'][1], places=5)
+
+    def test_slice(self):
+        write_archive(self.path, [load_columns(NOWCAST_FILE, ['temp', 'wind_speed'])])
+
+        with Archive(self.path) as archive:
+            start = archive.timestamps[2]
+            end = archive.timestamps[5]
+            timestamps, series = archive.slice(start, end, ['temp'])
+
+            self.assertEqual(3, len(timestamps))
+            self.assertEqual(['temp'], list(series))
+            self.assertEqual(archive['temp'][2:5].tolist(), series['temp'].tolist())
+            # slices are views on the memory map
+            self.assertIs(archive['temp'].obj, series['temp'].obj)
+
+            timestamps.release()
+            series['temp'].release()
+
+    def test_merge_and_skip_non_numeric(self):
+        nowcast = load_columns(NOWCAST_FILE, ['temp', 'sunrise'])
+        hourly = load_columns(HOURLY_FILE, ['temp', 'humidity'])
+        write_archive(self.path, [nowcast, hourly])
+
+        with Archive(self.path) as archive:
+            self.assertEqual(['temp', 'humidity'], archive.names)
+            self.assertEqual(sorted(archive.timestamps.tolist()), archive.timestamps.tolist())
+            # the hourly example precedes the nowcast example
+            self.assertAlmostEqual(71.99, archive['humidity'][0], places=4)
+            self.assertTrue(math.isnan(archive['humidity'][-1]))
+
+    def test_daily_aggregates(self):
+        write_archive(self.path, [load_columns(DAILY_FILE, ['temp', 'humidity'])])
+
+        with Archive(self.path) as archive:
+            self.assertEqual(['temp_min', 'temp_max', 'humidity_min', 'humidity_max'], archive.names)
+            self.assertAlmostEqual(94.81, archive['humidity_max'][0], places=4)
+
+    def test_categorical(self):
+        columns = Response(MockResponse(CATEGORICAL_ITEMS, 200), ['weather_code', 'precipitation_type']).get_columns()
+        write_archive(self.path, [columns])
+
+        with Archive(self.path) as archive:
+            self.assertEqual('h', archive['weather_code'].format)
+            self.assertEqual(['rain', 'cloudy', 'rain'], archive.decode('weather_code', archive['weather_code']))
+            self.assertEqual(MISSING, archive['precipitation_type'][1])
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not an archive')
+
+        self.assertRaises(ValueError, Archive, self.path)
@@ -0,0 +1,128 @@
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from climacell.backfill import backfill, backfill_directory, parse_payload, CsvSink, _chunk
+from climacell.tests.test_api import DAILY_FILE, ERROR_FILE, HOURLY_FILE, NOWCAST_FILE
+from climacell.tests.test_parsing import CATEGORICAL_ITEMS
+
+
+class CollectingSink:
+    def __init__(self):
+        self.chunks = {}
+
+    def __call__(self, chunk):
+        self.chunks[os.path.basename(chunk.source)] = {
+            name: (s.unit, list(s.timestamps), list(s.values)) for name, s in chunk.series.items()
+        }
+
+
+SHM_DIRECTORY = '/dev/shm'
+
+
+def shared_memory_segments():
+    return {name for name in os.listdir(SHM_DIRECTORY) if name.startswith('psm_')}
+
+
+class TestBackfill(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for file in (DAILY_FILE, ERROR_FILE, HOURLY_FILE, NOWCAST_FILE):
+            shutil.copy(file, self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_payload(self):
+        chunk = _chunk(parse_payload(HOURLY_FILE, ['temp', 'humidity']))
+        try:
+            self.assertEqual(['temp', 'humidity'], list(chunk.series))
+            self.assertEqual([2.56, 2.08], list(chunk.series['temp'].values))
+            self.assertEqual(1610632800.0, chunk.series['temp'].timestamps[0])
+            self.assertEqual(4, chunk.points)
+        finally:
+            chunk.release()
+
+        self.assertIsNone(chunk.shm)
+
+    def test_backfill_directory(self):
+        sink = CollectingSink()
+        report = backfill_directory(self.directory, sink, workers=2)
+
+        self.assertEqual(4, report.files)
+        self.assertEqual(
+            ['daily_example.json', 'error_example.json', 'hourly_example.json', 'nowcast_example.json'],
+            sorted(sink.chunks)
+        )
+        self.assertEqual({}, sink.chunks['error_example.json'])
+
+        daily = sink.chunks['daily_example.json']
+        self.assertEqual(('C', [1611727200.0], [1.04]), daily['temp_min'])
+
+        nowcast = sink.chunks['nowcast_example.json']
+        # sunrise values are strings and are passed on as a list
+        self.assertIsInstance(nowcast['sunrise'][2][0], str)
+
+        points = sum(len(values) for chunk in sink.chunks.values() for _, _, values in chunk.values())
+        self.assertEqual(points, report.points)
+        self.assertGreater(report.points_per_second, 0)
+
+    @skipUnless(os.path.isdir(SHM_DIRECTORY), 'shared memory is not listed in /dev/shm')
+    def test_bounded_window(self):
+        paths = [HOURLY_FILE] * 20
+        before = shared_memory_segments()
+        in_use = []
+
+        def sink(chunk):
+            in_use.append(len(shared_memory_segments() - before))
+
+        report = backfill(paths, sink, workers=2, window=3)
+
+        self.assertEqual(20, report.files)
+        self.assertLessEqual(max(in_use), 4)
+        self.assertEqual(set(), shared_memory_segments() - before)
+
+    @skipUnless(os.path.isdir(SHM_DIRECTORY), 'shared memory is not listed in /dev/shm')
+    def test_failing_sink_does_not_leak(self):
+        before = shared_memory_segments()
+
+        def sink(chunk):
+            raise RuntimeError('sink failed')
+
+        with self.assertRaises(RuntimeError):
+            backfill([HOURLY_FILE] * 10, sink, workers=2, window=4)
+
+        self.assertEqual(set(), shared_memory_segments() - before)
+
+    def test_missing_values_are_nan(self):
+        path = os.path.join(self.directory, 'missing.json')
+        with open(path, 'w') as f:
+            f.write('[{"observation_time": {"value": "2021-01-14T14:00:00Z"}, "temp": {"value": null, "units": "C"}}]')
+
+        sink = CollectingSink()
+        backfill([path], sink, workers=1)
+        self.assertTrue(math.isnan(sink.chunks['missing.json']['temp'][2][0]))
+
+    def test_categorical(self):
+        path = os.path.join(self.directory, 'categorical.json')
+        with open(path, 'w') as f:
+            json.dump(CATEGORICAL_ITEMS, f)
+
+        chunk = _chunk(parse_payload(path, ['weather_code', 'precipitation_type']))
+        try:
+            self.assertEqual(['rain', 'cloudy', 'rain'], chunk.series['weather_code'].decoded())
+            self.assertEqual(['rain', None, 'rain'], chunk.series['precipitation_type'].decoded())
+        finally:
+            chunk.release()
+
+    def test_csv_sink(self):
+        output = io.StringIO()
+        backfill([HOURLY_FILE], CsvSink(output), fields=['temp'], workers=1)
+
+        rows = output.getvalue().splitlines()
+        self.assertEqual(2, len(rows))
+        self.assertTrue(rows[0].endswith(',temp,1610632800.0,2.56,C'))
@@ -0,0 +1,99 @@
+import copy
+from unittest import TestCase
+
+from climacell.delta import DeltaPublisher, diff
+from climacell.parsing import get_plan
+
+
+def item(time, temp, weather_code):
+    return {
+        'observation_time': {'value': time},
+        'temp': {'value': temp, 'units': 'C'},
+        'weather_code': {'value': weather_code},
+    }
+
+
+def columns(items):
+    return get_plan(None, ['temp', 'weather_code'], items[0]).columns(items)
+
+
+PREVIOUS = [
+    item('2021-01-14T14:00:00.000Z', 2.5, 'cloudy'),
+    item('2021-01-14T15:00:00.000Z', 2.0, 'cloudy'),
+    item('2021-01-14T16:00:00.000Z', 1.5, 'rain'),
+]
+
+
+class TestDiff(TestCase):
+    def test_first_run_inserts_everything(self):
+        delta = diff(None, columns(PREVIOUS))
+
+        self.assertEqual(6, len(delta.inserted))
+        self.assertEqual(('weather_code', '2021-01-14T16:00:00.000Z', 'rain'), delta.inserted[-1])
+        self.assertEqual(3, delta.summary['temp'].inserted)
+
+    def test_unchanged(self):
+        delta = diff(columns(PREVIOUS), columns(copy.deepcopy(PREVIOUS)))
+
+        self.assertFalse(delta)
+        self.assertEqual(3, delta.summary['temp'].unchanged)
+
+    def test_changes(self):
+        current = [
+            item('2021-01-14T15:00:00.000Z', 2.05, 'cloudy'),
+            item('2021-01-14T16:00:00.000Z', 0.5, 'snow'),
+            item('2021-01-14T17:00:00.000Z', 0.0, None),
+        ]
+        delta = diff(columns(PREVIOUS), columns(current), tolerances={'temp': 0.1})
+
+        self.assertEqual([('temp', '2021-01-14T17:00:00.000Z', 0.0)], delta.inserted)
+        self.assertEqual(
+            [('temp', '2021-01-14T16:00:00.000Z', 1.5, 0.5), ('weather_code', '2021-01-14T16:00:00.000Z', 'rain', 'snow')],
+            delta.changed
+        )
+        self.assertEqual(
+            [('temp', '2021-01-14T14:00:00.000Z', 2.5), ('weather_code', '2021-01-14T14:00:00.000Z', 'cloudy')],
+            delta.dropped
+        )
+        self.assertEqual(1.0, delta.summary['temp'].max_change)
+        self.assertEqual(1, delta.summary['temp'].unchanged)
+
+    def test_default_tolerance(self):
+        current = copy.deepcopy(PREVIOUS)
+        current[0]['temp']['value'] = 2.6
+
+        self.assertFalse(diff(columns(PREVIOUS), columns(current), default_tolerance=0.5))
+        self.assertTrue(diff(columns(PREVIOUS), columns(current)))
+
+    def test_timestamp_field(self):
+        def sunrise_columns(sunrises):
+            items = [
+                {'observation_time': {'value': time}, 'sunrise': {'value': sunrise}}
+                for time, sunrise in zip(['2021-01-14T14:00:00.000Z', '2021-01-14T15:00:00.000Z'], sunrises)
+            ]
+            return get_plan(None, ['sunrise'], items[0]).columns(items)
+
+        previous = sunrise_columns(['2021-01-14T07:29:49.903Z', '2021-01-14T07:29:49.903Z'])
+        current = sunrise_columns(['2021-01-14T07:29:49.903Z', '2021-01-15T07:28:31.112Z'])
+
+        self.assertFalse(diff(previous, previous))
+        self.assertEqual(
+            [('sunrise', '2021-01-14T15:00:00.000Z', '2021-01-14T07:29:49.903Z', '2021-01-15T07:28:31.112Z')],
+            diff(previous, current).changed
+        )
+        self.assertEqual(1, diff(previous, current).summary['sunrise'].changed)
+
+
+class TestDeltaPublisher(TestCase):
+    def test_publish(self):
+        published = []
+        publisher = DeltaPublisher(lambda key, delta: published.append((key, len(delta))))
+
+        publisher.publish('home', columns(PREVIOUS))
+        publisher.publish('home', columns(copy.deepcopy(PREVIOUS)))
+        current = copy.deepcopy(PREVIOUS)
+        current[1]['temp']['value'] = 5
+        publisher.publish('home', columns(current))
+        publisher.publish('office', columns(current))
+
+        self.assertEqual([('home', 6), ('home', 1), ('office', 6)], published)
@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from climacell.fields import (
+    CATALOG, CORE_LAYER, AIR_QUALITY_LAYER, POLLEN_LAYER, ROAD_LAYER, FIRE_LAYER, INSURANCE_LAYER,
+    ENDPOINT_DAILY, ENDPOINT_HOURLY, ENDPOINT_NOWCAST, FIELD_TEMP, FIELD_ROAD_RISK, FIELD_WEATHER_CODE,
+    MIN_MAX, TYPE_CATEGORICAL, TYPE_NUMERIC, normalize_fields,
+)
+
+
+class TestCatalog(TestCase):
+    def test_all_fields_are_cataloged(self):
+        layers = CORE_LAYER + AIR_QUALITY_LAYER + POLLEN_LAYER + ROAD_LAYER + FIRE_LAYER + INSURANCE_LAYER
+        self.assertEqual(sorted(layers), sorted(CATALOG))
+
+    def test_spec(self):
+        spec = CATALOG[FIELD_TEMP]
+        self.assertEqual(TYPE_NUMERIC, spec.dtype)
+        self.assertEqual(MIN_MAX, spec.daily_aggregates)
+        self.assertIn(ENDPOINT_DAILY, spec.endpoints)
+        self.assertEqual(TYPE_CATEGORICAL, CATALOG[FIELD_WEATHER_CODE].dtype)
+
+    def test_normalize_fields(self):
+        self.assertEqual(['temp', 'humidity'], normalize_fields([' Temp', 'humidity', 'temp'], ENDPOINT_HOURLY))
+
+        self.assertRaises(ValueError, normalize_fields, ['temperature'], ENDPOINT_HOURLY)
+        self.assertRaises(ValueError, normalize_fields, [FIELD_ROAD_RISK], ENDPOINT_DAILY)
+        self.assertRaises(ValueError, normalize_fields, ['precipitation_probability'], ENDPOINT_NOWCAST)
+        self.assertRaises(ValueError, normalize_fields, [], ENDPOINT_HOURLY)
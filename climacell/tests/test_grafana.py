@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from unittest import TestCase
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from climacell.api import Client
+from climacell.grafana import Datasource, make_server, parse_target
+from climacell.parsing import get_plan
+from climacell.resilience import CircuitOpenError
+from climacell.serving import StaleWhileRevalidate
+from climacell.stub import StubServer
+from climacell.tests.test_api import DAILY_FILE, ERROR_FILE, HOURLY_FILE, NOWCAST_FILE, FakeClock, load
+
+
+class FailingSource:
+    def hourly(self, lat, lon, fields):
+        raise CircuitOpenError('Circuit open, not requesting /weather/forecast/hourly')
+
+
+class ColumnsResponse:
+    def __init__(self, items, fields):
+        self.columns = get_plan(None, fields, items[0]).columns(items)
+
+    def get_columns(self):
+        return self.columns
+
+
+class MissingSunriseSource:
+    def nowcast(self, lat, lon, fields, timestep):
+        items = load(NOWCAST_FILE)
+        items[0]['sunrise']['value'] = None
+        return ColumnsResponse(items, fields)
+
+
+class SlowSource:
+    def __init__(self):
+        self.calls = 0
+
+    def hourly(self, lat, lon, fields):
+        self.calls += 1
+        time.sleep(0.2)
+        return ColumnsResponse(load(HOURLY_FILE), fields)
+
+
+class TestHelpers(TestCase):
+    def test_parse_target(self):
+        self.assertEqual(('home', 'hourly', 'temp'), parse_target('home:hourly:temp'))
+        self.assertRaises(ValueError, parse_target, 'home:temp')
+
+
+class TestDatasourceServer(TestCase):
+    def setUp(self):
+        self.stub = StubServer({
+            '/weather/forecast/hourly': (200, load(HOURLY_FILE)),
+            '/weather/forecast/daily': (200, load(DAILY_FILE)),
+            '/weather/nowcast': (200, load(NOWCAST_FILE)),
+        }).start()
+        self.clock = FakeClock()
+        client = Client('apikey', base_url=self.stub.base_url)
+        self.cache = StaleWhileRevalidate(client, soft_ttl=60, hard_ttl=600, clock=self.clock)
+        self.datasource = Datasource(
+            self.cache,
+            {'home': (52.4, 4.8)},
+            {'hourly': ['temp', 'humidity'], 'daily': ['temp'], 'nowcast': ['temp', 'sunrise']},
+            clock=self.clock,
+        )
+        self.server = make_server(self.datasource, '127.0.0.1', 0)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache.close()
+        self.stub.stop()
+
+    def post(self, path, body):
+        host, port = self.server.server_address[:2]
+        request = Request(f'http://{host}:{port}{path}', data=json.dumps(body).encode(), method='POST')
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_search(self):
+        expected = ['home:hourly:temp', 'home:daily:temp', 'home:nowcast:temp']
+        self.assertEqual(expected, self.post('/search', {'target': 'temp'}))
+
+    def test_query(self):
+        body = {
+            'range': {'from': '2021-01-14T00:00:00.000Z', 'to': '2021-01-28T00:00:00.000Z'},
+            'targets': [{'target': 'home:hourly:temp'}, {'target': 'home:hourly:humidity'}, {'target': 'home:daily:temp'}],
+            'maxDataPoints': 100,
+        }
+        result = self.post('/query', body)
+
+        self.assertEqual(
+            ['home:hourly:temp', 'home:hourly:humidity', 'home:daily:temp_min', 'home:daily:temp_max'],
+            [series['target'] for series in result]
+        )
+        self.assertEqual([[2.56, 1610632800000], [2.08, 1610636400000]], result[0]['datapoints'])
+        # hourly and daily are requested once, for all targets
+        self.assertEqual(2, len(self.stub.requests))
+
+        # identical queries are answered from the result cache
+        self.stub.payloads.clear()
+        self.assertEqual(result, self.post('/query', body))
+
+        # after the result cache expired the stale while revalidate cache answers
+        self.clock.now = 30
+        self.assertEqual(result, self.post('/query', body))
+        self.assertEqual(2, len(self.stub.requests))
+
+    def test_query_max_data_points(self):
+        body = {
+            'range': {'from': '2021-01-14T00:00:00.000Z', 'to': '2021-01-15T00:00:00.000Z'},
+            'targets': [{'target': 'home:hourly:temp'}],
+            'maxDataPoints': 1,
+        }
+        result = self.post('/query', body)
+        self.assertEqual([[2.56, 1610632800000]], result[0]['datapoints'])
+
+    def test_annotations(self):
+        body = {
+            'range': {'from': '2021-01-26T00:00:00.000Z', 'to': '2021-01-27T00:00:00.000Z'},
+            'annotation': {'name': 'sunrise', 'query': 'home:nowcast:sunrise'},
+        }
+        result = self.post('/annotations', body)
+
+        self.assertTrue(result)
+        self.assertEqual('sunrise', result[0]['title'])
+        self.assertEqual(['home', 'sunrise'], result[0]['tags'])
+
+    def test_errors(self):
+        self.stub.payloads['/weather/forecast/hourly'] = (400, load(ERROR_FILE))
+        body = {'targets': [{'target': 'home:hourly:temp'}]}
+
+        with self.assertRaises(HTTPError) as context:
+            self.post('/query', body)
+        self.assertEqual(502, context.exception.code)
+
+        with self.assertRaises(HTTPError) as context:
+            self.post('/query', {'targets': [{'target': 'office:hourly:temp'}]})
+        self.assertEqual(400, context.exception.code)
+
+    def test_source_exceptions(self):
+        self.datasource.source = FailingSource()
+
+        with self.assertRaises(HTTPError) as context:
+            self.post('/query', {'targets': [{'target': 'home:hourly:temp'}]})
+
+        self.assertEqual(502, context.exception.code)
+        self.assertIn('CircuitOpenError', json.loads(context.exception.read())['message'])
+
+    def test_annotations_missing_value(self):
+        self.datasource.source = MissingSunriseSource()
+        body = {
+            'range': {'from': '2021-01-26T00:00:00.000Z', 'to': '2021-01-27T00:00:00.000Z'},
+            'annotation': {'name': 'sunrise', 'query': 'home:nowcast:sunrise'},
+        }
+
+        self.assertTrue(self.post('/annotations', body))
+
+    def test_targets_share_a_client_call(self):
+        self.datasource.source = Client('apikey', base_url=self.stub.base_url)
+        body = {'targets': [{'target': 'home:hourly:temp'}, {'target': 'home:hourly:humidity'}]}
+
+        self.assertEqual(2, len(self.post('/query', body)))
+        self.assertEqual(1, len(self.stub.requests))
+
+    def test_concurrent_queries_are_coalesced(self):
+        source = self.datasource.source = SlowSource()
+        body = {'targets': [{'target': 'home:hourly:temp'}]}
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.datasource.query(body))) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, source.calls)
+        self.assertEqual(4, len(results))
+        self.assertTrue(all(result is results[0] for result in results))
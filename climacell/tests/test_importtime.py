@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+import climacell
+from climacell.importtime import check, parse_importtime
+
+OUTPUT = '''import time: self [us] | cumulative | imported package
+import time:       156 |        156 |   climacell
+import time:      1848 |       2003 | climacell.fields
+'''
+
+
+class TestImportTime(TestCase):
+    def test_parse_importtime(self):
+        self.assertEqual({'climacell': (156, 156), 'climacell.fields': (1848, 2003)}, parse_importtime(OUTPUT))
+
+    def test_api_does_not_import_heavy_modules(self):
+        code = 'import sys, climacell.api; print(sorted(m for m in ("requests", "dateutil") if m in sys.modules))'
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+        self.assertEqual('[]', result.stdout.strip())
+
+    def test_check(self):
+        timings, violations = check({'climacell.api': {'max_ms': 1000, 'forbidden': ['climacell.parsing']}}, runs=1)
+
+        self.assertIn('climacell.api', timings)
+        self.assertEqual(['climacell.api imports climacell.parsing'], violations)
+
+    def test_lazy_namespace(self):
+        from climacell.api import Client
+
+        self.assertIs(Client, climacell.Client)
+        self.assertIn('Client', dir(climacell))
+        self.assertRaises(AttributeError, getattr, climacell, 'Missing')
@@ -0,0 +1,174 @@
+import json
+from datetime import timedelta
+from unittest import TestCase, mock
+
+from climacell.api import Client, Response
+from climacell.fields import FIELD_TEMP, FIELD_DEW_POINT, FIELD_HUMIDITY
+from climacell.instrumentation import (
+    Instrumentation, MetricsInstrumentation, TracerInstrumentation, Histogram,
+    PHASE_REQUEST, PHASE_SERVER, PHASE_DECODE, PHASE_PARSE,
+)
+from climacell.tests.test_api import ERROR_FILE, HOURLY_FILE, FakeClock, MockResponse
+
+
+class TimedMockResponse(MockResponse):
+    def __init__(self, data, status_code):
+        super().__init__(data, status_code)
+        self.content = json.dumps(data).encode()
+        self.elapsed = timedelta(milliseconds=20)
+
+
+def mock_requests_get(*args, **kwargs):
+    with open(HOURLY_FILE) as f:
+        return TimedMockResponse(json.load(f), 200)
+
+
+class HtmlMockResponse(TimedMockResponse):
+    def __init__(self):
+        super().__init__(None, 502)
+        self.content = b'<html><body>Bad Gateway</body></html>'
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.ended = False
+
+    def end(self):
+        self.ended = True
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes=None):
+        span = FakeSpan(name, attributes)
+        self.spans.append(span)
+        return span
+
+
+class TestHistogram(TestCase):
+    def test_observe(self):
+        histogram = Histogram((0.1, 1.0, float('inf')))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        self.assertEqual([1, 1, 1], histogram.counts)
+        self.assertEqual(3, histogram.count)
+        self.assertAlmostEqual(5.55, histogram.sum)
+
+    def test_quantile(self):
+        histogram = Histogram((0.1, 1.0, float('inf')))
+        self.assertIsNone(histogram.quantile(0.5))
+
+        for _ in range(9):
+            histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(1.0, histogram.quantile(0.95))
+
+
+class TestMetricsInstrumentation(TestCase):
+    @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
+    def test_client_phases(self, mock_get):
+        metrics = MetricsInstrumentation(clock=FakeClock(0.25))
+        client = Client('apikey', instrumentation=metrics)
+
+        response = client.hourly(52.4, 4.8, [FIELD_TEMP, FIELD_DEW_POINT, FIELD_HUMIDITY])
+        response.get_measurements()
+
+        endpoint = '/weather/forecast/hourly'
+        for phase in [PHASE_REQUEST, PHASE_DECODE, PHASE_PARSE]:
+            histogram = metrics.histogram(endpoint, phase)
+            self.assertEqual(1, histogram.count, msg=phase)
+            self.assertEqual(0.25, histogram.sum, msg=phase)
+
+        self.assertEqual(0.02, metrics.histogram(endpoint, PHASE_SERVER).sum)
+        self.assertEqual(len(response.response.content), metrics.bytes[endpoint])
+        self.assertEqual(0, sum(metrics.errors.values()))
+
+    def test_error_counts(self):
+        with open(ERROR_FILE) as f:
+            data = json.load(f)
+
+        metrics = MetricsInstrumentation(clock=FakeClock(0.1))
+        Response(MockResponse(data, 400), [FIELD_TEMP], '/weather/forecast/hourly', metrics)
+        Response(MockResponse(data, 400), [FIELD_TEMP], '/weather/forecast/hourly', metrics)
+
+        self.assertEqual(2, metrics.errors['BadRequest'])
+
+    @mock.patch('climacell.api.requests.get', side_effect=ConnectionError('refused'))
+    def test_transport_errors(self, mock_get):
+        metrics = MetricsInstrumentation(clock=FakeClock(0.25))
+        client = Client('apikey', instrumentation=metrics)
+
+        self.assertRaises(ConnectionError, client.hourly, 52.4, 4.8, [FIELD_TEMP])
+
+        self.assertEqual(1, metrics.errors['ConnectionError'])
+        self.assertEqual(1, metrics.histogram('/weather/forecast/hourly', PHASE_REQUEST).count)
+
+    @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
+    def test_noop_default(self, mock_get):
+        client = Client('apikey')
+        self.assertIsInstance(client.instrumentation, Instrumentation)
+
+        response = client.hourly(52.4, 4.8, [FIELD_TEMP])
+        self.assertEqual(2, len(response.get_measurements()))
+
+
+class TestTracerInstrumentation(TestCase):
+    @mock.patch('climacell.api.requests.get', side_effect=mock_requests_get)
+    def test_spans(self, mock_get):
+        tracer = FakeTracer()
+        client = Client('apikey', instrumentation=TracerInstrumentation(tracer))
+
+        client.hourly(52.4, 4.8, [FIELD_TEMP]).get_measurements()
+
+        names = [span.name for span in tracer.spans]
+        self.assertEqual(['climacell.request', 'climacell.decode', 'climacell.parse'], names)
+        self.assertTrue(all(span.ended for span in tracer.spans))
+        self.assertEqual('/weather/forecast/hourly', tracer.spans[0].attributes['endpoint'])
+
+    @mock.patch('climacell.api.requests.get', side_effect=ConnectionError('refused'))
+    def test_transport_error_spans(self, mock_get):
+        tracer = FakeTracer()
+        client = Client('apikey', instrumentation=TracerInstrumentation(tracer))
+
+        self.assertRaises(ConnectionError, client.hourly, 52.4, 4.8, [FIELD_TEMP])
+
+        self.assertEqual(['climacell.request', 'climacell.error'], [span.name for span in tracer.spans])
+        self.assertTrue(all(span.ended for span in tracer.spans))
+        self.assertEqual('ConnectionError', tracer.spans[1].attributes['code'])
+
+    @mock.patch('climacell.api.requests.get', return_value=HtmlMockResponse())
+    def test_decode_error_spans(self, mock_get):
+        tracer = FakeTracer()
+        client = Client('apikey', instrumentation=TracerInstrumentation(tracer))
+
+        self.assertRaises(ValueError, client.hourly, 52.4, 4.8, [FIELD_TEMP])
+
+        names = [span.name for span in tracer.spans]
+        self.assertEqual(['climacell.request', 'climacell.decode', 'climacell.error'], names)
+        self.assertTrue(all(span.ended for span in tracer.spans))
+        self.assertEqual('JSONDecodeError', tracer.spans[2].attributes['code'])
+
+    @mock.patch('climacell.api.requests.get')
+    def test_parse_error_spans(self, mock_get):
+        item = {'observation_time': {'value': '2021-01-14T14:00:00.000Z'}, 'temp': 5}
+        mock_get.return_value = TimedMockResponse([item], 200)
+        tracer = FakeTracer()
+        client = Client('apikey', instrumentation=TracerInstrumentation(tracer))
+        response = client.hourly(52.4, 4.8, [FIELD_TEMP])
+
+        self.assertRaises(TypeError, response.get_columns)
+
+        names = [span.name for span in tracer.spans]
+        self.assertEqual(['climacell.request', 'climacell.decode', 'climacell.parse', 'climacell.error'], names)
+        self.assertTrue(all(span.ended for span in tracer.spans))
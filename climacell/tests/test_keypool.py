@@ -0,0 +1,81 @@
+from collections import Counter
+from unittest import TestCase
+
+from climacell.keypool import KeyPool, NoKeyAvailableError, PooledClient, remaining_quota
+from climacell.resilience import STATE_CLOSED, CircuitBreaker, CircuitOpenError
+from climacell.stub import StubServer
+from climacell.tests.test_api import HOURLY_FILE, FakeClock, load
+
+
+class TestKeyPool(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.pool = KeyPool(['a', 'b', 'c'], rate_limited_cooldown=60, revoked_cooldown=600, clock=self.clock, seed=1)
+        self.a, self.b, self.c = self.pool.keys
+
+    def test_remaining_quota(self):
+        self.assertEqual(5, remaining_quota({'X-RateLimit-Remaining-hour': '5', 'x-ratelimit-remaining-day': '80'}))
+        self.assertIsNone(remaining_quota({'Content-Type': 'application/json'}))
+
+    def test_weighted_by_remaining_quota(self):
+        self.pool.record(self.a, 200, {'X-RateLimit-Remaining': '900'})
+        self.pool.record(self.b, 200, {'X-RateLimit-Remaining': '100'})
+        self.pool.record(self.c, 200, {'X-RateLimit-Remaining': '0'})
+
+        chosen = Counter(self.pool.choose().key for _ in range(1000))
+
+        self.assertEqual({'a', 'b'}, set(chosen))
+        self.assertGreater(chosen['a'], 800)
+        self.assertEqual(1000, self.a.used + self.b.used)
+
+    def test_cooldown(self):
+        self.pool.record(self.a, 429, {})
+        self.pool.record(self.b, 401, {})
+
+        self.assertEqual([self.c], self.pool.available())
+
+        self.clock.now = 60
+        self.assertEqual([self.a, self.c], self.pool.available())
+        self.assertEqual(1, self.b.errors[401])
+
+        self.pool.record(self.c, 403, {})
+        self.pool.record(self.a, 200, {'X-RateLimit-Remaining': '0'})
+        self.assertRaises(NoKeyAvailableError, self.pool.choose)
+
+    def test_empty(self):
+        self.assertRaises(ValueError, KeyPool, [])
+
+
+class TestPooledClient(TestCase):
+    def test_spreads_over_keys(self):
+        quotas = {'a': 3, 'b': 3}
+        with StubServer({'/weather/forecast/hourly': (200, load(HOURLY_FILE))}, quotas=quotas) as stub:
+            client = PooledClient(KeyPool(['a', 'b', 'revoked'], seed=1), base_url=stub.base_url)
+            responses = [client.hourly(52.4, 4.8, ['temp']) for _ in range(6)]
+
+            self.assertRaises(NoKeyAvailableError, client.hourly, 52.4, 4.8, ['temp'])
+
+        self.assertFalse(any(response.has_error for response in responses))
+        self.assertEqual({'a': 0, 'b': 0}, quotas)
+        self.assertEqual(1, client.pool.keys[2].errors[401])
+
+    def test_exhausted_key_does_not_open_the_circuit(self):
+        quotas = {'exhausted': 0, 'a': 10}
+        breaker = CircuitBreaker(window=4, min_calls=2)
+        with StubServer({'/weather/forecast/hourly': (200, load(HOURLY_FILE))}, quotas=quotas) as stub:
+            client = PooledClient(KeyPool(['exhausted', 'a'], seed=3), base_url=stub.base_url, circuit_breaker=breaker)
+            responses = [client.hourly(52.4, 4.8, ['temp']) for _ in range(4)]
+
+        self.assertFalse(any(response.has_error for response in responses))
+        self.assertEqual(1, client.pool.keys[0].errors[429])
+        self.assertEqual(STATE_CLOSED, breaker.state)
+
+    def test_open_circuit_is_not_charged_to_a_key(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_calls=2, clock=clock)
+        breaker.record(False)
+        breaker.record(False)
+        client = PooledClient(['a'], circuit_breaker=breaker)
+
+        self.assertRaises(CircuitOpenError, client.hourly, 52.4, 4.8, ['temp'])
+        self.assertEqual(Counter(), client.pool.keys[0].errors)
@@ -0,0 +1,40 @@
+from collections import Counter
+from unittest import TestCase
+
+from climacell.load import LoadReport, grid, percentile, run_load
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.has_error = status_code != 200
+
+
+class TestLoad(TestCase):
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+
+        self.assertEqual(50.0, percentile(values, 0.5))
+        self.assertEqual(99.0, percentile(values, 0.99))
+        self.assertEqual(1.0, percentile(values, 0.0))
+
+    def test_report(self):
+        report = LoadReport([0.3, 0.1, 0.2], Counter({429: 1}), 2.0)
+
+        self.assertEqual(1.5, report.throughput)
+        self.assertEqual(0.2, report.p50)
+        self.assertEqual(0.3, report.p99)
+        self.assertIn('429: 1', str(report))
+
+    def test_run_load(self):
+        def call(lat, lon):
+            if lat < -59.5:
+                raise ConnectionError()
+            return FakeResponse(429 if lon < -179 else 200)
+
+        locations = grid(250)
+        report = run_load(call, locations, concurrency=4, iterations=2)
+
+        self.assertEqual(250, len(set(locations)))
+        self.assertEqual(500, report.calls)
+        self.assertEqual({'ConnectionError': 200, 429: 8}, dict(report.errors))
@@ -0,0 +1,235 @@
+import copy
+import math
+from unittest import TestCase
+
+from climacell.api import Measurement
+from climacell.fields import FIELD_TEMP, FIELD_DEW_POINT, FIELD_HUMIDITY, FIELD_SUNRISE
+from climacell.parsing import (
+    get_plan, get_dictionary, Dictionary, MISSING, SHAPE_SCALAR, SHAPE_UNITLESS, SHAPE_AGGREGATE,
+)
+from climacell.tests.test_api import DAILY_FILE, HOURLY_FILE, NOWCAST_FILE, load
+
+
+class TestExtractionPlan(TestCase):
+    def test_shapes(self):
+        data = load(NOWCAST_FILE)
+        plan = get_plan(None, [FIELD_TEMP, FIELD_SUNRISE], data[0])
+        self.assertEqual({FIELD_TEMP: SHAPE_SCALAR, FIELD_SUNRISE: SHAPE_UNITLESS}, plan.shapes)
+
+        data = load(DAILY_FILE)
+        plan = get_plan(None, [FIELD_TEMP], data[0])
+        self.assertEqual({FIELD_TEMP: SHAPE_AGGREGATE}, plan.shapes)
+
+    def test_plan_is_cached(self):
+        data = load(HOURLY_FILE)
+        fields = [FIELD_TEMP, FIELD_HUMIDITY]
+
+        plan = get_plan('/weather/forecast/hourly', fields, data[0])
+        self.assertIs(plan, get_plan('/weather/forecast/hourly', list(fields), data[1]))
+        self.assertIsNot(plan, get_plan(None, fields, data[0]))
+
+    def test_units_are_read_per_response(self):
+        si = load(HOURLY_FILE)
+        us = copy.deepcopy(si)
+        for item in us:
+            item[FIELD_TEMP] = {'value': item[FIELD_TEMP]['value'] * 9 / 5 + 32, 'units': 'F'}
+
+        fields = [FIELD_TEMP, FIELD_HUMIDITY]
+        get_plan('/weather/forecast/hourly', fields, si[0]).columns(si)
+        columns = get_plan('/weather/forecast/hourly', fields, us[0]).columns(us)
+
+        self.assertEqual({FIELD_TEMP: 'F', FIELD_HUMIDITY: '%'}, columns.units)
+        self.assertTrue(str(columns.measurements(Measurement)[0]).startswith('temp: 36.608 F'))
+
+        daily = load(DAILY_FILE)
+        get_plan('/weather/forecast/daily', [FIELD_TEMP], daily[0]).columns(daily)
+        for entry in daily[0][FIELD_TEMP]:
+            for key in ('min', 'max'):
+                if key in entry:
+                    entry[key]['units'] = 'F'
+
+        columns = get_plan('/weather/forecast/daily', [FIELD_TEMP], daily[0]).columns(daily)
+        self.assertEqual({'temp_min': 'F', 'temp_max': 'F'}, columns.units)
+
+    def test_daily_measurements(self):
+        data = load(DAILY_FILE)
+        fields = [FIELD_TEMP, FIELD_DEW_POINT]
+        measurements = get_plan(None, fields, data[0]).columns(data).measurements(Measurement)
+
+        self.assertEqual(
+            ['temp_min', 'temp_max', 'dewpoint_min', 'dewpoint_max'],
+            [m.field for m in measurements]
+        )
+        self.assertEqual(1.04, measurements[0].value)
+        self.assertEqual('C', measurements[1].unit)
+        self.assertEqual(2021, measurements[3].observation_time.year)
+
+    def test_unitless_measurements(self):
+        data = load(NOWCAST_FILE)
+        measurements = get_plan(None, [FIELD_SUNRISE], data[0]).columns(data).measurements(Measurement)
+
+        self.assertEqual(len(data), len(measurements))
+        self.assertIsNone(measurements[0].unit)
+
+
+class TestDailyColumns(TestCase):
+    def test_aggregates_by_key(self):
+        sample = {
+            'observation_time': {'value': '2021-01-26'},
+            'precipitation': [
+                {'observation_time': '2021-01-26T12:00:00Z', 'max': {'value': 0.5, 'units': 'mm/hr'}},
+            ],
+            'precipitation_accumulation': [
+                {'observation_time': '2021-01-26T00:00:00Z', 'accumulation': {'value': 3.2, 'units': 'mm'}},
+            ],
+            'temp': [
+                {'observation_time': '2021-01-26T12:00:00Z', 'max': {'value': 6.13, 'units': 'C'}},
+                {'observation_time': '2021-01-27T06:00:00Z', 'min': {'value': 1.04, 'units': 'C'}},
+            ],
+        }
+        second = {
+            'observation_time': {'value': '2021-01-27'},
+            'precipitation': [
+                {'observation_time': '2021-01-27T12:00:00Z', 'max': {'value': 0.1, 'units': 'mm/hr'}},
+            ],
+            'precipitation_accumulation': [
+                {'observation_time': '2021-01-27T00:00:00Z', 'accumulation': {'value': 0.4, 'units': 'mm'}},
+            ],
+            'temp': [
+                {'observation_time': '2021-01-28T06:00:00Z', 'min': {'value': 0.5, 'units': 'C'}},
+            ],
+        }
+        fields = ['precipitation', 'precipitation_accumulation', 'temp']
+        columns = get_plan(None, fields, sample).columns([sample, second])
+
+        self.assertEqual(
+            ['precipitation_max', 'precipitation_accumulation', 'temp_min', 'temp_max'],
+            columns.names
+        )
+        self.assertEqual([3.2, 0.4], columns['precipitation_accumulation'].values.tolist())
+        self.assertEqual('mm', columns['precipitation_accumulation'].unit)
+        self.assertEqual([1.04, 0.5], columns['temp_min'].values.tolist())
+        self.assertEqual([6.13, None], columns['temp_max'].decoded())
+        self.assertTrue(math.isnan(columns['temp_max'].values[1]))
+        self.assertEqual(['2021-01-26', '2021-01-27'], columns.times)
+
+        # the missing temp max of the second day is skipped
+        self.assertEqual(7, len(columns.measurements(Measurement)))
+
+
+CATEGORICAL_ITEMS = [
+    {
+        'observation_time': {'value': '2021-01-14T14:00:00.000Z'},
+        'weather_code': {'value': 'rain'},
+        'precipitation_type': {'value': 'rain'},
+    },
+    {
+        'observation_time': {'value': '2021-01-14T15:00:00.000Z'},
+        'weather_code': {'value': 'cloudy'},
+        'precipitation_type': {'value': None},
+    },
+    {
+        'observation_time': {'value': '2021-01-14T16:00:00.000Z'},
+        'weather_code': {'value': 'rain'},
+        'precipitation_type': {'value': 'rain'},
+    },
+]
+
+
+class TestCategoricalColumns(TestCase):
+    def test_codes(self):
+        fields = ['weather_code', 'precipitation_type']
+        columns = get_plan(None, fields, CATEGORICAL_ITEMS[0]).columns(CATEGORICAL_ITEMS)
+
+        weather_code = columns['weather_code']
+        self.assertTrue(weather_code.is_categorical)
+        self.assertIs(get_dictionary('weather_code'), weather_code.dictionary)
+        self.assertEqual(weather_code.values[0], weather_code.values[2])
+        self.assertNotEqual(weather_code.values[0], weather_code.values[1])
+        self.assertEqual(['rain', 'cloudy', 'rain'], weather_code.decoded())
+        self.assertEqual(MISSING, columns['precipitation_type'].values[1])
+
+        measurements = columns.measurements(Measurement)
+        self.assertEqual(['rain', 'rain', 'cloudy', None], [m.value for m in measurements[:4]])
+
+    def test_codes_are_shared_across_responses(self):
+        first = get_plan(None, ['weather_code'], CATEGORICAL_ITEMS[0]).columns(CATEGORICAL_ITEMS)
+        second = get_plan(None, ['weather_code'], CATEGORICAL_ITEMS[1]).columns(CATEGORICAL_ITEMS[1:])
+
+        self.assertEqual(list(first['weather_code'].values[1:]), list(second['weather_code'].values))
+        # interned values are shared between decoded series
+        self.assertIs(first['weather_code'].decoded()[0], second['weather_code'].decoded()[1])
+
+    def test_dictionary_limit(self):
+        dictionary = Dictionary(limit=2)
+        self.assertEqual([0, 1, 0], [dictionary.encode(value) for value in ['rain', 'snow', 'rain']])
+        self.assertRaises(OverflowError, dictionary.encode, 'hail')
+        self.assertEqual(2, len(dictionary))
+
+    def test_full_dictionary(self):
+        dictionary = get_dictionary('precipitation_type')
+        dictionary.encode('rain')
+        limit = dictionary.limit
+        dictionary.limit = len(dictionary)
+        items = copy.deepcopy(CATEGORICAL_ITEMS)
+        items[1]['precipitation_type']['value'] = 'unseen precipitation type'
+
+        try:
+            columns = get_plan(None, ['precipitation_type'], items[0]).columns(items)
+        finally:
+            dictionary.limit = limit
+
+        self.assertFalse(columns['precipitation_type'].is_categorical)
+        self.assertEqual(['rain', 'unseen precipitation type', 'rain'], columns['precipitation_type'].values)
+        self.assertNotIn('unseen precipitation type', dictionary.codes)
+
+
+class TestCatalogTypes(TestCase):
+    def test_typed_outputs(self):
+        data = load(NOWCAST_FILE)
+        columns = get_plan(None, [FIELD_TEMP, FIELD_SUNRISE], data[0]).columns(data)
+
+        self.assertEqual('d', columns[FIELD_TEMP].values.typecode)
+        self.assertIsInstance(columns[FIELD_SUNRISE].values, list)
+
+    def test_integer_values_are_kept(self):
+        items = [
+            {'observation_time': {'value': '2021-01-14T14:00:00.000Z'},
+             'epa_aqi': {'value': 42}, 'hail_binary': {'value': 1}, 'temp': {'value': 2.5, 'units': 'C'}},
+            {'observation_time': {'value': '2021-01-14T15:00:00.000Z'},
+             'epa_aqi': {'value': 40.5}, 'hail_binary': {'value': 0}, 'temp': {'value': 3, 'units': 'C'}},
+        ]
+        columns = get_plan(None, ['epa_aqi', 'hail_binary', FIELD_TEMP], items[0]).columns(items)
+
+        self.assertEqual('d', columns['epa_aqi'].values.typecode)
+        self.assertEqual([42.0, 40.5], columns['epa_aqi'].values.tolist())
+
+        values = [m.value for m in columns.measurements(Measurement)]
+        self.assertEqual([42, 1, 2.5, 40.5, 0, 3], values)
+        self.assertEqual([int, int, float, float, int, int], [type(value) for value in values])
+        self.assertEqual('epa_aqi: 42 at 2021-01-14 14:00:00+00:00', str(columns.measurements(Measurement)[0]))
+
+    def test_values_not_matching_the_catalog(self):
+        items = [
+            {'observation_time': {'value': '2021-01-14T14:00:00.000Z'},
+             'temp': {'value': 2.5, 'units': 'C'}, 'weather_code': {'value': 'rain'}},
+            {'observation_time': {'value': '2021-01-14T15:00:00.000Z'},
+             'temp': {'value': 'n/a', 'units': 'C'}, 'weather_code': {'value': 3}},
+            {'observation_time': {'value': '2021-01-14T16:00:00.000Z'},
+             'temp': {'value': None, 'units': 'C'}, 'weather_code': {'value': None}},
+        ]
+        columns = get_plan(None, [FIELD_TEMP, 'weather_code'], items[0]).columns(items)
+
+        self.assertEqual([2.5, 'n/a', None], columns[FIELD_TEMP].values)
+        self.assertEqual(['rain', 3, None], columns['weather_code'].values)
+        self.assertFalse(columns['weather_code'].is_categorical)
+
+        daily = load(DAILY_FILE)
+        daily[0][FIELD_TEMP][0]['min']['value'] = 'n/a'
+        columns = get_plan(None, [FIELD_TEMP], daily[0]).columns(daily)
+        self.assertEqual('n/a', columns['temp_min'].values[0])
+
+    def test_unknown_field(self):
+        sample = {'observation_time': {'value': '2021-01-14T14:00:00.000Z'}, 'custom': {'value': 'x'}}
+        columns = get_plan(None, ['custom'], sample).columns([sample])
+        self.assertEqual(['x'], columns['custom'].values)
@@ -0,0 +1,187 @@
+import threading
+import time
+from unittest import TestCase
+
+from climacell.api import Client
+from climacell.instrumentation import MetricsInstrumentation
+from climacell.resilience import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, CircuitOpenError, Hedging
+from climacell.serving import StaleWhileRevalidate
+from climacell.stub import StubServer
+from climacell.tests.test_api import HOURLY_FILE, FakeClock, MockResponse, load
+
+HOURLY_PATH = '/weather/forecast/hourly'
+
+
+class TestCircuitBreaker(TestCase):
+    def test_opens_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, cooldown=10, clock=clock)
+
+        for success in (True, False, True):
+            self.assertFalse(breaker.record(success))
+        self.assertTrue(breaker.record(False))
+        self.assertEqual(STATE_OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertEqual(STATE_HALF_OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+        self.assertFalse(breaker.record(True))
+
+        self.assertEqual(STATE_CLOSED, breaker.state)
+        self.assertEqual(1, breaker.trips)
+        self.assertEqual(2, breaker.rejected)
+
+    def test_failed_probe_opens_again(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_calls=2, cooldown=10, clock=clock)
+        breaker.record(False)
+        breaker.record(False)
+
+        clock.now = 10
+        breaker.allow()
+
+        self.assertTrue(breaker.record(False))
+        self.assertFalse(breaker.allow())
+        self.assertEqual(2, breaker.trips)
+
+    def test_invalid_failure_rate(self):
+        self.assertRaises(ValueError, CircuitBreaker, failure_rate=0)
+
+
+class TestHedging(TestCase):
+    def test_delay(self):
+        hedging = Hedging(quantile=0.5, min_samples=3, initial_delay=1.0, buckets=(0.1, 0.2, float('inf')))
+        self.assertEqual(1.0, hedging.delay('/hourly'))
+
+        for seconds in (0.05, 0.15, 0.15):
+            hedging.observe('/hourly', seconds)
+
+        self.assertEqual(0.2, hedging.delay('/hourly'))
+        self.assertEqual(1.0, hedging.delay('/daily'))
+
+
+class SlowTransport:
+    def __init__(self, delays):
+        self.delays = delays
+        self.threads = []
+
+    def get(self, url, params, headers, timeout=None):
+        self.threads.append(threading.current_thread())
+        time.sleep(self.delays.pop(0))
+        return MockResponse(load(HOURLY_FILE), 200)
+
+
+class TestClientResilience(TestCase):
+    def setUp(self):
+        self.delays = []
+        self.stub = StubServer(
+            {HOURLY_PATH: (200, load(HOURLY_FILE))}, latency=lambda: self.delays.pop(0) if self.delays else 0.0
+        ).start()
+        self.metrics = MetricsInstrumentation()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_timeout(self):
+        self.delays = [0.5]
+        client = Client('apikey', base_url=self.stub.base_url, timeouts={'hourly': 0.1})
+
+        with self.assertRaises(Exception) as context:
+            client.hourly(52.4, 4.8, ['temp'])
+
+        self.assertIn('timed out', str(context.exception))
+
+    def test_failed_attempts_are_observed(self):
+        self.delays = [0.5]
+        hedging = Hedging()
+        client = Client('apikey', base_url=self.stub.base_url, timeouts={'hourly': 0.1}, hedging=hedging)
+
+        self.assertRaises(Exception, client.hourly, 52.4, 4.8, ['temp'])
+
+        self.assertEqual(1, hedging.histograms[HOURLY_PATH].count)
+        self.assertGreaterEqual(hedging.histograms[HOURLY_PATH].sum, 0.1)
+
+    def test_hedged_request(self):
+        self.delays = [1.0]
+        hedging = Hedging(initial_delay=0.05)
+        client = Client('apikey', base_url=self.stub.base_url, instrumentation=self.metrics, hedging=hedging)
+
+        response = client.hourly(52.4, 4.8, ['temp'])
+        client.close()
+
+        self.assertFalse(response.has_error)
+        self.assertEqual(2, len(self.stub.requests))
+        self.assertLess(self.metrics.histogram(HOURLY_PATH, 'request').sum, 0.5)
+        self.assertEqual(1, self.metrics.hedges[HOURLY_PATH])
+        self.assertEqual(1, self.metrics.hedge_wins[HOURLY_PATH])
+
+    def test_duplicate_answering_first(self):
+        transport = SlowTransport([2.0, 0.06])
+        hedging = Hedging(initial_delay=0.05)
+        client = Client('apikey', instrumentation=self.metrics, transport=transport, hedging=hedging)
+
+        start = time.perf_counter()
+        response = client.hourly(52.4, 4.8, ['temp'])
+        elapsed = time.perf_counter() - start
+        client.close()
+
+        self.assertFalse(response.has_error)
+        self.assertGreaterEqual(elapsed, 0.11)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual('climacell-request', transport.threads[0].name)
+        self.assertTrue(transport.threads[1].name.startswith('climacell-hedge'))
+        self.assertEqual(1, self.metrics.hedge_wins[HOURLY_PATH])
+
+    def test_primary_answering_first(self):
+        transport = SlowTransport([0.2, 0.5])
+        hedging = Hedging(initial_delay=0.05)
+        client = Client('apikey', instrumentation=self.metrics, transport=transport, hedging=hedging)
+
+        start = time.perf_counter()
+        response = client.hourly(52.4, 4.8, ['temp'])
+        elapsed = time.perf_counter() - start
+        client.close()
+
+        self.assertFalse(response.has_error)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(1, self.metrics.hedges[HOURLY_PATH])
+        self.assertEqual(0, self.metrics.hedge_wins[HOURLY_PATH])
+
+    def test_no_hedge_for_fast_requests(self):
+        hedging = Hedging(initial_delay=1.0)
+        client = Client('apikey', base_url=self.stub.base_url, instrumentation=self.metrics, hedging=hedging)
+
+        client.hourly(52.4, 4.8, ['temp'])
+        client.close()
+
+        self.assertEqual(1, len(self.stub.requests))
+        self.assertEqual(0, self.metrics.hedges[HOURLY_PATH])
+
+    def test_circuit_breaker_serves_stale(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(window=2, min_calls=2, cooldown=60, clock=clock)
+        client = Client(
+            'apikey', base_url=self.stub.base_url, instrumentation=self.metrics, circuit_breaker=breaker,
+            timeouts={'hourly': 0.1},
+        )
+        cache = StaleWhileRevalidate(client, soft_ttl=10, hard_ttl=1000, clock=clock)
+        fresh = cache.hourly(52.4, 4.8, ['temp'])
+
+        self.delays = [0.3, 0.3]
+        for _ in range(2):
+            clock.now += 20
+            self.assertIs(fresh, cache.hourly(52.4, 4.8, ['temp']))
+            cache.wait(5)
+
+        requests = len(self.stub.requests)
+        clock.now += 20
+        self.assertIs(fresh, cache.hourly(52.4, 4.8, ['temp']))
+        cache.wait(5)
+        cache.close()
+
+        self.assertEqual(requests, len(self.stub.requests))
+        self.assertEqual(STATE_OPEN, breaker.state)
+        self.assertEqual(1, self.metrics.trips[HOURLY_PATH])
+        self.assertRaises(CircuitOpenError, client.hourly, 52.4, 4.8, ['temp'])
@@ -0,0 +1,94 @@
+import threading
+from unittest import TestCase
+
+from climacell.serving import StaleWhileRevalidate
+from climacell.tests.test_api import FakeClock
+
+
+class FakeResponse:
+    def __init__(self, number, has_error=False):
+        self.number = number
+        self.has_error = has_error
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+        self.error = False
+        self.exception = None
+        self.gate = None
+
+    def hourly(self, lat, lon, fields):
+        if self.gate is not None:
+            self.gate.wait(5)
+
+        self.calls += 1
+
+        if self.exception is not None:
+            raise self.exception
+
+        return FakeResponse(self.calls, self.error)
+
+
+class TestStaleWhileRevalidate(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = FakeClient()
+        self.cache = StaleWhileRevalidate(self.client, soft_ttl=60, hard_ttl=600, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_fresh(self):
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+        self.clock.now = 30
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+        self.assertEqual(1, self.client.calls)
+        self.assertEqual(30, self.cache.age('hourly', 52.4, 4.8, ['temp']))
+        self.assertIsNone(self.cache.age('hourly', 0, 0, ['temp']))
+
+    def test_stale_triggers_single_background_refresh(self):
+        self.cache.hourly(52.4, 4.8, ['temp'])
+        self.clock.now = 120
+        self.client.gate = threading.Event()
+
+        # both calls are answered with the stale response right away
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+
+        self.client.gate.set()
+        self.cache.wait()
+
+        self.assertEqual(2, self.client.calls)
+        self.assertEqual(2, self.cache.hourly(52.4, 4.8, ['temp']).number)
+        self.assertEqual(0, self.cache.age('hourly', 52.4, 4.8, ['temp']))
+
+    def test_error_keeps_stale_response(self):
+        self.cache.hourly(52.4, 4.8, ['temp'])
+        self.client.error = True
+        self.clock.now = 120
+
+        self.cache.hourly(52.4, 4.8, ['temp'])
+        self.cache.wait()
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+        self.assertEqual(120, self.cache.age('hourly', 52.4, 4.8, ['temp']))
+
+        self.client.error = False
+        self.client.exception = ConnectionError()
+        self.cache.hourly(52.4, 4.8, ['temp'])
+        self.cache.wait()
+        self.assertEqual(1, self.cache.hourly(52.4, 4.8, ['temp']).number)
+
+    def test_hard_ttl(self):
+        self.cache.hourly(52.4, 4.8, ['temp'])
+        self.client.error = True
+        self.clock.now = 601
+
+        response = self.cache.hourly(52.4, 4.8, ['temp'])
+        self.assertTrue(response.has_error)
+
+        self.client.exception = ConnectionError()
+        self.assertRaises(ConnectionError, self.cache.hourly, 52.4, 4.8, ['temp'])
+
+    def test_invalid_ttl(self):
+        self.assertRaises(ValueError, StaleWhileRevalidate, self.client, soft_ttl=60, hard_ttl=30)
@@ -0,0 +1,148 @@
+import math
+from unittest import TestCase
+
+from climacell.api import Error
+from climacell.parsing import get_plan
+from climacell.stitching import (
+    INTERPOLATE_CIRCULAR, INTERPOLATE_NEAREST, fetch_timeline, format_timestamp, interpolate, merge, stitch, time_grid,
+)
+from climacell.utils import parse_timestamp
+
+START = parse_timestamp('2021-01-14T12:00:00Z')
+HOUR = 3600
+
+
+def item(offset, temp, weather_code):
+    return {
+        'observation_time': {'value': format_timestamp(START + offset)},
+        'temp': {'value': temp, 'units': 'C'},
+        'weather_code': {'value': weather_code},
+    }
+
+
+def columns(items, fields=('temp', 'weather_code')):
+    return get_plan(None, list(fields), items[0]).columns(items)
+
+
+NOWCAST = columns([item(0, 1.0, 'rain'), item(1800, 2.0, 'rain'), item(3600, 3.0, 'cloudy')])
+HOURLY = columns([item(0, 10.0, 'clear'), item(HOUR, 10.0, 'clear'), item(2 * HOUR, 5.0, 'clear')])
+DAILY = columns([{
+    'observation_time': {'value': '2021-01-14'},
+    'temp': [
+        {'observation_time': format_timestamp(START + 4 * HOUR), 'min': {'value': -1.0, 'units': 'C'}},
+        {'observation_time': format_timestamp(START - HOUR), 'max': {'value': 8.0, 'units': 'C'}},
+    ],
+}], fields=('temp',))
+
+
+class FakeResponse:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def get_columns(self):
+        return self.columns
+
+
+class FakeSource:
+    def __init__(self):
+        self.calls = []
+
+    def nowcast(self, lat, lon, fields, timestep):
+        self.calls.append(('nowcast', fields))
+        return FakeResponse(Error({'message': 'Unavailable', 'errorCode': 'Unavailable', 'statusCode': 503}))
+
+    def hourly(self, lat, lon, fields):
+        self.calls.append(('hourly', fields))
+        return FakeResponse(HOURLY)
+
+    def daily(self, lat, lon, fields):
+        self.calls.append(('daily', fields))
+        return FakeResponse(DAILY)
+
+
+class TestStitching(TestCase):
+    def test_time_grid(self):
+        self.assertEqual([0, 900, 1800], time_grid(0, 1800, 900))
+        self.assertRaises(ValueError, time_grid, 0, 10, 0)
+
+    def test_merge_prefers_finest_resolution(self):
+        timestamps, values, first = merge([NOWCAST, HOURLY, DAILY], 'temp')
+
+        self.assertEqual([START - HOUR, START, START + 1800, START + HOUR, START + 2 * HOUR, START + 4 * HOUR], timestamps)
+        self.assertEqual([8.0, 1.0, 2.0, 3.0, 5.0, -1.0], values)
+        self.assertIs(NOWCAST['temp'], first)
+
+    def test_merge_accumulation_from_finest_source(self):
+        hourly = columns([
+            {'observation_time': {'value': format_timestamp(START + offset)},
+             'precipitation_accumulation': {'value': value, 'units': 'mm'}}
+            for offset, value in ((0, 0.5), (HOUR, 1.0))
+        ], fields=('precipitation_accumulation',))
+        daily = columns([
+            {'observation_time': {'value': format_timestamp(START + offset)},
+             'precipitation_accumulation': {'value': value, 'units': 'mm'}}
+            for offset, value in ((-24 * HOUR, 12.0), (24 * HOUR, 20.0))
+        ], fields=('precipitation_accumulation',))
+
+        timestamps, values, first = merge([hourly, daily], 'precipitation_accumulation')
+
+        self.assertEqual([START, START + HOUR], timestamps)
+        self.assertEqual([0.5, 1.0], values)
+        self.assertIs(hourly['precipitation_accumulation'], first)
+
+        timeline = stitch([hourly, daily], time_grid(START - HOUR, START + 2 * HOUR, HOUR))
+        self.assertTrue(math.isnan(timeline['precipitation_accumulation'].values[0]))
+        self.assertEqual([0.5, 1.0], timeline['precipitation_accumulation'].decoded()[1:3])
+
+    def test_interpolate(self):
+        result = interpolate([0, 10], [0.0, 5.0], [-5, 0, 4, 10, 15])
+
+        self.assertEqual([0.0, 2.0, 5.0], list(result[1:4]))
+        self.assertTrue(math.isnan(result[0]) and math.isnan(result[4]))
+        self.assertEqual([None, 1, 2, None], interpolate([0, 10], [1, 2], [-1, 4, 6, 11], INTERPOLATE_NEAREST, [None] * 4))
+
+    def test_interpolate_circular(self):
+        result = interpolate([0, 3600], [350.0, 10.0], [900, 1800, 2700], INTERPOLATE_CIRCULAR)
+        self.assertEqual([355.0, 0.0, 5.0], [round(value, 6) for value in result])
+
+        result = interpolate([0, 3600], [10.0, 350.0], [900], INTERPOLATE_CIRCULAR)
+        self.assertAlmostEqual(5.0, result[0])
+
+    def test_stitch_wind_direction(self):
+        hourly = columns([
+            {'observation_time': {'value': format_timestamp(START + offset)},
+             'wind_direction': {'value': value, 'units': 'degrees'}}
+            for offset, value in ((0, 350.0), (HOUR, 10.0))
+        ], fields=('wind_direction',))
+
+        timeline = stitch([hourly], time_grid(START, START + HOUR, HOUR / 2))
+        self.assertEqual([350.0, 0.0, 10.0], timeline['wind_direction'].decoded())
+
+    def test_stitch(self):
+        grid = time_grid(START - HOUR, START + 4 * HOUR, HOUR / 2)
+        timeline = stitch([NOWCAST, HOURLY, DAILY], grid)
+
+        self.assertEqual(['temp', 'weather_code'], timeline.names)
+        self.assertEqual(len(grid), len(timeline))
+        self.assertEqual('2021-01-14T11:00:00.000Z', timeline.times[0])
+        self.assertEqual(
+            [8.0, 4.5, 1.0, 2.0, 3.0, 4.0, 5.0, 3.5, 2.0, 0.5, -1.0],
+            timeline['temp'].decoded()
+        )
+        self.assertEqual(
+            [None, None, 'rain', 'rain', 'cloudy', 'cloudy', 'clear', None, None, None, None],
+            timeline['weather_code'].decoded()
+        )
+        self.assertEqual('C', timeline['temp'].unit)
+        self.assertIs(timeline.times, timeline['temp'].times)
+
+    def test_fetch_timeline(self):
+        source = FakeSource()
+        grid = time_grid(START, START + 2 * HOUR, HOUR)
+        timeline = fetch_timeline(source, 52.4, 4.8, ['temp', 'sunrise'], grid)
+
+        self.assertEqual(
+            [('nowcast', ['temp', 'sunrise']), ('hourly', ['temp', 'sunrise']), ('daily', ['temp', 'sunrise'])],
+            source.calls
+        )
+        self.assertEqual([10.0, 10.0, 5.0], timeline['temp'].decoded())
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from climacell.api import Client
+from climacell.stub import StubServer, synthetic_forecast
+from climacell.tests.test_api import HOURLY_FILE, load
+from climacell.transport import RecordingTransport, ReplayTransport, load_recording
+
+
+class TestRecordReplay(TestCase):
+    def setUp(self):
+        self.stub = StubServer({'/weather/forecast/hourly': (200, load(HOURLY_FILE))}).start()
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+
+    def tearDown(self):
+        self.stub.stop()
+        os.remove(self.path)
+
+    def test_record_and_replay(self):
+        recorder = Client('secret', base_url=self.stub.base_url, transport=RecordingTransport(self.path))
+        recorded = recorder.hourly(52.4, 4.8, ['temp']).get_measurements()
+        recorder.nowcast(52.4, 4.8, ['temp'], 5)
+
+        exchanges = load_recording(self.path)
+        self.assertEqual(['/weather/forecast/hourly', '/weather/nowcast'], [e['path'] for e in exchanges])
+        self.assertNotIn('secret', open(self.path).read())
+
+        replay = Client('other', base_url=self.stub.base_url, transport=ReplayTransport(exchanges))
+        replayed = replay.hourly(52.4, 4.8, ['temp']).get_measurements()
+
+        self.assertEqual([str(m) for m in recorded], [str(m) for m in replayed])
+        self.assertTrue(replay.nowcast(52.4, 4.8, ['temp'], 5).has_error)
+        self.assertRaises(KeyError, replay.hourly, 0.0, 0.0, ['temp'])
+
+    def test_replay_by_path(self):
+        Client('secret', base_url=self.stub.base_url, transport=RecordingTransport(self.path)).hourly(1, 2, ['temp'])
+
+        replay = Client('other', base_url=self.stub.base_url, transport=ReplayTransport.from_file(self.path, False))
+
+        self.assertFalse(replay.hourly(52.4, 4.8, ['humidity']).has_error)
+
+
+class TestStubInjection(TestCase):
+    def test_rate_limit_and_errors(self):
+        with StubServer({'/weather/forecast/hourly': (200, [])}, rate_limit_rate=0.5, error_rate=0.5, seed=1) as stub:
+            client = Client('apikey', base_url=stub.base_url)
+            statuses = {client.hourly(52.4, 4.8, ['temp']).status_code for _ in range(20)}
+
+        self.assertEqual({429, 500}, statuses)
+
+    def test_from_recording_and_synthetic(self):
+        payload = synthetic_forecast(['temp', 'weather_code'], points=3, seed=1)
+        exchanges = [{'path': '/v3/weather/forecast/hourly', 'status': 200, 'body': json.dumps(payload)}]
+
+        with StubServer.from_recording(exchanges, latency=0.01) as stub:
+            response = Client('apikey', base_url=stub.base_url + '/v3').hourly(52.4, 4.8, ['temp', 'weather_code'])
+
+        columns = response.get_columns()
+        self.assertEqual(3, len(columns))
+        self.assertEqual([None] * 3, columns['weather_code'].decoded())
+        self.assertTrue(all(isinstance(value, float) for value in columns['temp'].decoded()))
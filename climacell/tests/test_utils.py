@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from unittest import TestCase
 
-from climacell.utils import join_fields, check_datetime_str, parse_datetime_str
+from climacell.utils import join_fields, check_datetime_str, parse_datetime_str, parse_timestamp
 
 
 class TestUtils(TestCase):
@@ -18,3 +18,11 @@ class TestUtils(TestCase):
     def test_parse_datetime_str(self):
         expected = datetime(2021, 1, 14, 21, tzinfo=timezone.utc)
         self.assertEqual(expected, parse_datetime_str('2021-01-14T21:00:00.000Z'))
+
+    def test_parse_timestamp(self):
+        expected = datetime(2021, 1, 14, 21, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(expected, parse_timestamp('2021-01-14T21:00:00.000Z'))
+        self.assertEqual(expected, parse_timestamp('2021-01-14T21:00:00Z'))
+        self.assertEqual(expected, parse_timestamp('2021-01-14T22:00:00+01:00'))
+        self.assertEqual(expected - 21 * 3600, parse_timestamp('2021-01-14'))
+        self.assertEqual(expected, parse_timestamp('Jan 14 2021 21:00 UTC'))
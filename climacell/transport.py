@@ -0,0 +1,111 @@
+import json
+import threading
+from datetime import timedelta
+from urllib.parse import urlparse
+
+from climacell.api import RequestsTransport
+
+
+class RecordedResponse:
+    def __init__(self, status_code, content, headers=None, elapsed=0.0):
+        """
+        A response read from a recording, providing the parts of requests.Response the client uses
+
+        :param int status_code: HTTP status code
+        :param bytes content: response body
+        :param dict headers: response headers
+        :param float elapsed: seconds the original request took
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.elapsed = timedelta(seconds=elapsed)
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _exchange_key(path, params):
+    return path, tuple(sorted((name, str(value)) for name, value in params.items()))
+
+
+def load_recording(path):
+    """
+    :param str path: JSON lines file written by a RecordingTransport
+    :return: the recorded exchanges
+    :rtype: list[dict]
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingTransport:
+    def __init__(self, path, transport=None):
+        """
+        Saves every exchange of a transport as a line of JSON. API keys are never recorded.
+
+        :param str path: file to append the exchanges to
+        :param transport: transport executing the requests, defaults to RequestsTransport
+        """
+        self.path = path
+        self.transport = transport or RequestsTransport()
+        self._lock = threading.Lock()
+
+    def get(self, url, params, headers, timeout=None):
+        response = self.transport.get(url, params, headers, timeout=timeout)
+        elapsed = getattr(response, 'elapsed', None)
+        exchange = {
+            'path': urlparse(url).path,
+            'params': {name: str(value) for name, value in params.items()},
+            'status': response.status_code,
+            'headers': dict(getattr(response, 'headers', {}) or {}),
+            'body': response.content.decode(),
+            'elapsed': elapsed.total_seconds() if elapsed is not None else 0.0,
+        }
+
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(exchange) + '\n')
+
+        return response
+
+
+class ReplayTransport:
+    def __init__(self, exchanges, strict_params=True):
+        """
+        Answers requests from recorded exchanges without network access. Requests
+        matching several exchanges cycle through them in recording order.
+
+        :param list[dict] exchanges: exchanges, see load_recording
+        :param bool strict_params: match on path and parameters, otherwise on path only
+        """
+        self.strict_params = strict_params
+        self._exchanges = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+        for exchange in exchanges:
+            self._exchanges.setdefault(self._key(exchange['path'], exchange['params']), []).append(exchange)
+
+    @classmethod
+    def from_file(cls, path, strict_params=True):
+        return cls(load_recording(path), strict_params)
+
+    def _key(self, path, params):
+        return _exchange_key(path, params if self.strict_params else {})
+
+    def get(self, url, params, headers, timeout=None):
+        key = self._key(urlparse(url).path, params)
+
+        if key not in self._exchanges:
+            raise KeyError(f'No recorded exchange for {key[0]} {dict(key[1])}')
+
+        with self._lock:
+            exchanges = self._exchanges[key]
+            position = self._positions.get(key, 0)
+            self._positions[key] = (position + 1) % len(exchanges)
+
+        exchange = exchanges[position]
+        return RecordedResponse(
+            exchange['status'], exchange['body'].encode(), exchange['headers'], exchange['elapsed']
+        )
@@ -1,4 +1,4 @@
-from dateutil import parser
+from datetime import datetime, timezone
 
 
 def join_fields(fields):
@@ -29,4 +29,29 @@ def check_datetime_str(datetime_str):
 
 
 def parse_datetime_str(datetime_str):
+    from dateutil import parser
+
     return parser.parse(datetime_str)
+
+
+def parse_timestamp(datetime_str):
+    """
+    Parse a datetime string to seconds since the epoch. ISO 8601 strings as
+    returned by the API are parsed without dateutil, naive values are treated as UTC.
+
+    :param str datetime_str:
+    :return: seconds since the epoch
+    :rtype: float
+    """
+    if datetime_str.endswith('Z'):
+        datetime_str = datetime_str[:-1] + '+00:00'
+
+    try:
+        value = datetime.fromisoformat(datetime_str)
+    except ValueError:
+        value = parse_datetime_str(datetime_str)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return value.timestamp()